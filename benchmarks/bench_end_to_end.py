@@ -0,0 +1,238 @@
+"""End-to-end scraper benchmark against a local fake brain.com.ua.
+
+Starts benchmarks/fake_brain.py in-process, points the scraper at it through
+BRAIN_HOME_URL and runs search (find_product_url), product parsing
+(fetch_product) and the database save path for every page. Reports per-stage
+latency, pages/min, the wait report and peak RSS, and writes them as JSON to
+results/benchmarks/ so runs on different commits can be compared:
+
+    python benchmarks/bench_end_to_end.py --pages 20 --latency 0.05 --lazy-delay 0.3
+    python benchmarks/bench_end_to_end.py --pages 20 --compare results/benchmarks/e2e-<commit>.json
+
+Saved rows are rolled back at the end, so the database is left untouched.
+"""
+import argparse
+import contextlib
+import importlib
+import json
+import math
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR / "modules"))
+
+from fake_brain import FakeBrainSite  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:  # optional: without it only this process' RSS is reported
+    psutil = None
+
+RESULTS_DIR = BASE_DIR / "results" / "benchmarks"
+STAGES = ("search", "parse", "save")
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """Nearest-rank percentile of values (0.0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(percent / 100.0 * len(ordered))) - 1]
+
+
+def current_tree_rss() -> Optional[float]:
+    """RSS in MB of this process and all its children (chromedriver, Chrome), if psutil is installed."""
+    if psutil is None:
+        return None
+    process = psutil.Process()
+    total = 0
+    for proc in [process] + process.children(recursive=True):
+        with contextlib.suppress(psutil.Error):
+            total += proc.memory_info().rss
+    return total / 1024 ** 2
+
+
+def own_peak_rss() -> Optional[float]:
+    """Peak RSS of this process in MB (ru_maxrss is KB on Linux, bytes on macOS)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize_stage(timings: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(timings),
+        "total": sum(timings),
+        "mean": statistics.fmean(timings) if timings else 0.0,
+        "p50": percentile(timings, 50),
+        "p95": percentile(timings, 95),
+        "max": max(timings, default=0.0),
+    }
+
+
+def run(args: argparse.Namespace, site: FakeBrainSite) -> Dict[str, Any]:
+    # The scraper reads BRAIN_HOME_URL at import time
+    os.environ["BRAIN_HOME_URL"] = site.home_url
+    parser = importlib.import_module("2_parse_product")
+    from browser import build_driver
+    from db_writer import upsert_products
+    from driver_pool import DriverPool
+    from http_fetch import HttpClient
+    from waits import wait_report
+    from django.db import connection, transaction
+    from django.db.utils import OperationalError
+
+    save = not args.no_save
+    if save:
+        try:
+            connection.ensure_connection()
+        except OperationalError as e:
+            raise SystemExit(f"Database unavailable ({e}); start it or pass --no-save.")
+
+    timings: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    failures: List[Dict[str, str]] = []
+    incomplete = 0
+    peak_tree_rss = 0.0
+    wait_report.reset()
+    products = [site.products[i % len(site.products)] for i in range(args.pages)]
+
+    started = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        pool = stack.enter_context(DriverPool(partial(build_driver, lean=args.lean), max_size=1))
+        http_client = stack.enter_context(HttpClient()) if args.http else None
+        if save:
+            stack.enter_context(transaction.atomic())
+        for index, product in enumerate(products, start=1):
+            stage = "search"
+            try:
+                stage_started = time.perf_counter()
+                url = parser.find_product_url(product["name"], timeout=args.timeout, pool=pool)
+                timings["search"].append(time.perf_counter() - stage_started)
+                if not url:
+                    raise RuntimeError("no search result")
+
+                stage = "parse"
+                stage_started = time.perf_counter()
+                data = parser.fetch_product(url, timeout=args.timeout, pool=pool, http_client=http_client)
+                timings["parse"].append(time.perf_counter() - stage_started)
+                if data["missing_fields"]:
+                    incomplete += 1
+                    print(f"Missing fields: {data['missing_fields']}")
+
+                if save:
+                    stage = "save"
+                    stage_started = time.perf_counter()
+                    upsert_products([data])
+                    timings["save"].append(time.perf_counter() - stage_started)
+            except Exception as e:
+                failures.append({"page": product["slug"], "stage": stage, "error": f"{type(e).__name__}: {e}"})
+                print(f"[{index}/{len(products)}] FAILED at {stage}: {e}")
+            else:
+                print(f"[{index}/{len(products)}] ok: {product['slug']}")
+            tree_rss = current_tree_rss()
+            if tree_rss is not None:
+                peak_tree_rss = max(peak_tree_rss, tree_rss)
+        if save:
+            # Leave the database untouched
+            transaction.set_rollback(True)
+    wall = time.perf_counter() - started
+
+    return {
+        "commit": git_commit(),
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {
+            key: getattr(args, key)
+            for key in ("pages", "products", "latency", "lazy_delay", "timeout", "lean", "http", "no_save")
+        },
+        "pages": len(products),
+        "failures": failures,
+        "incomplete": incomplete,
+        "wall_seconds": wall,
+        "pages_per_minute": (len(products) - len(failures)) / wall * 60 if wall else 0.0,
+        "stages": {stage: summarize_stage(values) for stage, values in timings.items()},
+        "waits": wait_report.totals(),
+        "peak_rss_mb": {"process": own_peak_rss(), "process_tree": peak_tree_rss if psutil is not None else None},
+        "server_requests": site.requests,
+    }
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    print(f"\n===== end-to-end benchmark ({report['commit'] or 'unknown commit'}) =====")
+    print(
+        f"{report['pages']} pages, {len(report['failures'])} failed, {report['incomplete']} with missing fields, "
+        f"{report['wall_seconds']:.1f}s, "
+        f"{report['pages_per_minute']:.1f} pages/min"
+    )
+    for stage, stats in report["stages"].items():
+        line = f"  {stage:<8} p50 {stats['p50'] * 1000:9.1f} ms   p95 {stats['p95'] * 1000:9.1f} ms   n={stats['count']}"
+        if baseline and stage in baseline["stages"] and baseline["stages"][stage]["p50"]:
+            change = stats["p50"] / baseline["stages"][stage]["p50"] * 100 - 100
+            line += f"   p50 {change:+.1f}% vs {baseline['commit']}"
+        print(line)
+    if baseline and baseline["pages_per_minute"]:
+        change = report["pages_per_minute"] / baseline["pages_per_minute"] * 100 - 100
+        print(f"  pages/min {change:+.1f}% vs {baseline['commit']}")
+    rss = report["peak_rss_mb"]
+    own = f"{rss['process']:.0f} MB" if rss["process"] is not None else "n/a"
+    tree = f"{rss['process_tree']:.0f} MB" if rss["process_tree"] is not None else "n/a (install psutil)"
+    print(f"Peak RSS: process {own}, process tree incl. Chrome {tree}")
+    print("Time spent waiting per step:")
+    for step, seconds in sorted(report["waits"].items(), key=lambda item: -item[1]):
+        print(f"  {step:<28} {seconds:8.2f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end benchmark against a local fake brain.com.ua")
+    parser.add_argument("--pages", type=int, default=20, help="Products to search, parse and save")
+    parser.add_argument("--products", type=int, default=50, help="Products in the fake catalogue")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every fake-server response")
+    parser.add_argument("--lazy-delay", type=float, default=0.0, help="Seconds before lazy content appears")
+    parser.add_argument("--timeout", type=int, default=25, help="Element wait timeout")
+    parser.add_argument("--lean", action="store_true", help="Use the lean browser profile")
+    parser.add_argument("--http", action="store_true", help="Parse over plain HTTP, browser as fallback")
+    parser.add_argument("--no-save", action="store_true", help="Skip the database save stage")
+    parser.add_argument("--output", help="Result JSON file (default: results/benchmarks/e2e-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="Earlier result JSON to compare against")
+    args = parser.parse_args()
+
+    with FakeBrainSite(args.products, args.latency, args.lazy_delay) as site:
+        report = run(args, site)
+
+    baseline = json.loads(Path(args.compare).read_text(encoding="utf-8")) if args.compare else None
+    print_report(report, baseline)
+
+    if args.output:
+        output = Path(args.output)
+    else:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = RESULTS_DIR / f"e2e-{report['commit'] or 'nogit'}-{stamp}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
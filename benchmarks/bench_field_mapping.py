@@ -0,0 +1,108 @@
+"""Micro-benchmark of characteristic -> field derivation (color, memory, screen size, resolution).
+
+Compares the precompiled one-pass engine in product_fields (resolve_fields)
+with the previous per-field scans on synthetic spec tables of increasing
+size, and checks both give identical results. Cold runs clear the key cache
+first; warm runs reuse it across products, as a worker or re-extraction does.
+
+    python benchmarks/bench_field_mapping.py --keys 50 200 800 --products 2000
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "modules"))
+
+from product_fields import key_fields, resolve_fields  # noqa: E402
+
+# Keys seen on brain.com.ua spec tables; the rest are generated filler
+REAL_KEYS = [
+    "Виробник", "Модель", "Колір", "Вбудована пам'ять", "Оперативна пам'ять", "Діагональ екрану",
+    "Роздільна здатність екрану", "Тип матриці", "Частота оновлення", "Процесор", "Кількість ядер",
+    "Основна камера", "Фронтальна камера", "Ємність акумулятора", "Операційна система", "Вага", "Габарити",
+    "Матеріал корпусу", "Bluetooth", "Wi-Fi", "NFC", "Гарантія", "Країна виробництва",
+]
+VALUES = ["Black", "128 ГБ", "6.1\"", "2556x1179", "Apple", "iPhone 15", "OLED", "120 Гц", "", "Так"]
+
+
+def legacy_derive(characteristics: Dict[str, str], candidates: Tuple[str, ...]) -> Optional[str]:
+    """The previous derive_field_from_characteristics."""
+    for key, value in characteristics.items():
+        key_lower = key.lower()
+        if any(candidate.lower() in key_lower for candidate in candidates):
+            return value if value else None
+    return None
+
+
+def legacy_fields(characteristics: Dict[str, str]) -> Dict[str, Optional[str]]:
+    """The previous build_product_data field derivation, without the name heuristics."""
+    color = legacy_derive(characteristics, ("Колір", "колір", "цвет", "Color"))
+    if not color:
+        color = characteristics.get("Колір")
+    memory = legacy_derive(characteristics, ("Об'єм пам'яті", "пам", "память", "Memory", "Вбудована пам'ять"))
+    if not memory:
+        memory = characteristics.get("Вбудована пам'ять")
+    screen_size = legacy_derive(characteristics, ("Діагональ екрану", "Діагональ", "діагональ", "Диагональ", "Screen", "Display"))
+    if not screen_size:
+        screen_size = characteristics.get("Діагональ екрану")
+    resolution = legacy_derive(characteristics, ("Роздільна здатність дисплея", "Роздільна здатність екрану", "роздільна", "Разрешение", "Resolution"))
+    if not resolution:
+        resolution = characteristics.get("Роздільна здатність екрану")
+    for key, value in characteristics.items():
+        key_lower = key.lower()
+        if ("діагональ" in key_lower or "диагональ" in key_lower) and not screen_size:
+            screen_size = value
+        if ("розділь" in key_lower or "разреш" in key_lower) and not resolution:
+            resolution = value
+    return {"color": color, "memory": memory, "screen_size": screen_size, "resolution": resolution}
+
+
+def make_tables(keys: int, products: int, seed: int = 42) -> List[Dict[str, str]]:
+    """products spec tables of about keys keys each, drawn from a shared key vocabulary."""
+    rng = random.Random(seed)
+    vocabulary = REAL_KEYS + [f"Характеристика {i} (додаткова)" for i in range(keys * 2)]
+    tables = []
+    for _ in range(products):
+        chosen = rng.sample(vocabulary, min(keys, len(vocabulary)))
+        tables.append({key: rng.choice(VALUES) for key in chosen})
+    return tables
+
+
+def time_per_product(resolve: Callable[[Dict[str, str]], Dict[str, Optional[str]]], tables: List[Dict[str, str]], repeat: int) -> float:
+    """Median over repeat runs of the mean microseconds per product."""
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for table in tables:
+            resolve(table)
+        runs.append((time.perf_counter() - started) / len(tables) * 1e6)
+    return statistics.median(runs)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark characteristic -> field derivation")
+    parser.add_argument("--keys", type=int, nargs="+", default=[50, 200, 800], help="Keys per spec table")
+    parser.add_argument("--products", type=int, default=2000, help="Spec tables per size")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement (median is reported)")
+    args = parser.parse_args()
+
+    print(f"{'keys':>6} {'legacy µs':>11} {'cold µs':>9} {'warm µs':>9} {'speedup':>8}")
+    for keys in args.keys:
+        tables = make_tables(keys, args.products)
+        mismatches = sum(1 for table in tables if legacy_fields(table) != resolve_fields(table))
+        if mismatches:
+            raise SystemExit(f"{mismatches} of {len(tables)} tables resolve differently from the legacy code")
+        legacy = time_per_product(legacy_fields, tables, args.repeat)
+        key_fields.cache_clear()
+        cold = time_per_product(resolve_fields, tables[:1], 1)
+        warm = time_per_product(resolve_fields, tables, args.repeat)
+        print(f"{keys:>6} {legacy:>11.1f} {cold:>9.1f} {warm:>9.1f} {legacy / warm:>7.1f}x")
+    print(f"Key cache: {key_fields.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Compare Product query plans and latency with and without the query-serving indexes.
+
+Seeds synthetic rows into the local PostgreSQL database inside one transaction,
+runs the typical queries with the indexes dropped and then present, prints
+EXPLAIN ANALYZE output and median latency, and rolls everything back.
+
+    python benchmarks/bench_product_indexes.py --rows 300000
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "modules"))
+
+from load_django import *  # noqa: F401,F403,E402 - initialize Django
+from django.db import connection, transaction  # noqa: E402
+
+from parser_app.models import JsonBlob, Product  # noqa: E402
+
+# "%%" is a literal modulo: the statements are executed with a query parameter.
+# Characteristics repeat per series (500 shared blobs), JSON-LD is one blob per product.
+SEED_BLOBS_SQL = """
+INSERT INTO {blobs} (hash, data, size, created_at)
+SELECT 'bench-chars-' || s,
+       jsonb_build_object('Колір', (ARRAY['Black', 'White', 'Blue', 'Pink'])[1 + s %% 4],
+                          'Вбудована пам''ять', (64 * (1 + s %% 4)) || ' ГБ',
+                          'Серія', 'Series ' || s),
+       0, now()
+FROM generate_series(0, 499) AS s
+UNION ALL
+SELECT 'bench-jsonld-' || g,
+       jsonb_build_object('@type', 'Product', 'sku', 'BENCH' || g,
+                          'brand', jsonb_build_object('name', (ARRAY['Apple', 'Samsung', 'Xiaomi', 'Motorola', 'Nokia'])[1 + g %% 5])),
+       0, now()
+FROM generate_series(1, %s) AS g
+"""
+SEED_SQL = """
+INSERT INTO {table} (name, url, sku, currency, images, review_count, characteristics_hash, missing_fields,
+                     raw_jsonld_hash, content_hash, price, created_at, updated_at)
+SELECT 'Bench product ' || g,
+       'https://brain.com.ua/ukr/bench-' || g || '.html',
+       'BENCH' || g,
+       'UAH', '[]', 0,
+       'bench-chars-' || (g %% 500),
+       '[]',
+       'bench-jsonld-' || g,
+       '', 1000 + g %% 5000,
+       now() - make_interval(secs => g), now() - make_interval(secs => g)
+FROM generate_series(1, %s) AS g
+"""
+
+
+def build_queries(rows: int):
+    probe = rows // 2
+    return {
+        "latest page (default ordering)": lambda: Product.objects.all()[:50],
+        "by sku": lambda: Product.objects.filter(sku=f"BENCH{probe}"),
+        "by url": lambda: Product.objects.filter(url=f"https://brain.com.ua/ukr/bench-{probe}.html"),
+        "characteristics @>": lambda: Product.objects.filter(characteristics_blob__data__contains={"Серія": "Series 42"}),
+        "raw_jsonld @>": lambda: Product.objects.filter(raw_jsonld_blob__data__contains={"sku": f"BENCH{probe}"}),
+    }
+
+
+def measure(queries, repeat: int):
+    results = {}
+    for label, make_query in queries.items():
+        plan = make_query().explain(analyze=True, buffers=True)
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(make_query())
+            timings.append((time.perf_counter() - started) * 1000)
+        results[label] = (statistics.median(timings), plan)
+    return results
+
+
+def report(title: str, results) -> None:
+    print(f"\n===== {title} =====")
+    for label, (median_ms, plan) in results.items():
+        print(f"\n--- {label}: median {median_ms:.2f} ms")
+        print(plan)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark Product indexes on seeded data")
+    parser.add_argument("--rows", type=int, default=300000, help="Synthetic rows to seed")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per query for the median")
+    args = parser.parse_args()
+
+    if connection.vendor != "postgresql":
+        print("This benchmark needs PostgreSQL.")
+        return
+
+    table = connection.ops.quote_name(Product._meta.db_table)
+    blobs = connection.ops.quote_name(JsonBlob._meta.db_table)
+    index_names = [index.name for index in Product._meta.indexes + JsonBlob._meta.indexes]
+    queries = build_queries(args.rows)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            started = time.perf_counter()
+            cursor.execute(SEED_BLOBS_SQL.format(blobs=blobs), [args.rows])
+            cursor.execute(SEED_SQL.format(table=table), [args.rows])
+            cursor.execute(f"ANALYZE {blobs}")
+            cursor.execute(f"ANALYZE {table}")
+            print(f"Seeded {args.rows} rows in {time.perf_counter() - started:.1f}s")
+
+            savepoint = transaction.savepoint()
+            for name in index_names:
+                cursor.execute(f"DROP INDEX IF EXISTS {connection.ops.quote_name(name)}")
+            without = measure(queries, args.repeat)
+            transaction.savepoint_rollback(savepoint)
+        with_indexes = measure(queries, args.repeat)
+        # Leave the database untouched: seeded rows and dropped indexes are rolled back
+        transaction.set_rollback(True)
+
+    report("without indexes", without)
+    report("with indexes", with_indexes)
+    print("\n===== summary (median ms) =====")
+    for label in queries:
+        print(f"{label:<32} {without[label][0]:10.2f} -> {with_indexes[label][0]:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""Local fake of the brain.com.ua pages the scraper touches, for offline benchmarks.
+
+Serves a homepage with the quick-search form, a search results page with
+product cards and product pages with JSON-LD and a #br-pr-7 characteristics
+block whose "Всі характеристики" button loads the remaining rows over XHR.
+Every response can be delayed (network latency) and the results cards and
+extra characteristics can be inserted by JavaScript after a delay (lazy
+loading), so the condition-driven waits are exercised like on the real site.
+
+    python benchmarks/fake_brain.py --port 8800 --latency 0.05 --lazy-delay 0.3
+"""
+import argparse
+import html
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+BRANDS = ("Apple", "Samsung", "Xiaomi", "Motorola", "Nokia")
+COLORS = ("Black", "White", "Blue", "Pink", "Green")
+MEMORY_SIZES = (64, 128, 256, 512)
+# Rows rendered with the page in lazy mode; the rest arrive when the button is clicked
+VISIBLE_ROWS = 3
+
+HOME_PAGE = """<!DOCTYPE html>
+<html lang="uk"><head><meta charset="utf-8"><title>Fake Brain</title></head>
+<body>
+<header>
+  <form action="/search/" method="get">
+    <input type="text" class="quick-search-input" name="Search" autocomplete="off">
+    <input type="submit" class="qsr-submit" value="Пошук">
+  </form>
+</header>
+<main>{cards}</main>
+</body></html>
+"""
+
+SEARCH_PAGE = """<!DOCTYPE html>
+<html lang="uk"><head><meta charset="utf-8"><title>Пошук: {query}</title></head>
+<body>
+<header><input type="text" class="quick-search-input" name="Search" value="{query}"></header>
+<main id="results">{cards}</main>
+<script>
+var lazyCards = {lazy_cards};
+if (lazyCards) {{
+  setTimeout(function () {{ document.getElementById('results').innerHTML = lazyCards; }}, {lazy_delay_ms});
+}}
+</script>
+</body></html>
+"""
+
+CARD = """<div class="br-pp br-pp-ex goods-block__item br-pcg br-series" data-pid="{pid}">
+  <a href="/ukr/{slug}.html"><img src="/img/{pid}.jpg" alt=""><span>{name}</span></a>
+  <div class="br-pp-price br-pp-price-main"><span>{price}</span> ₴</div>
+</div>"""
+
+PRODUCT_PAGE = """<!DOCTYPE html>
+<html lang="uk"><head>
+<meta charset="utf-8"><title>{name}</title>
+<link rel="canonical" href="{base}/ukr/{slug}.html">
+<script type="application/ld+json">{jsonld}</script>
+</head>
+<body>
+<h1>{name}</h1>
+<div class="comments-average-rating-stars"></div><div class="br-pp-r"><span>{reviews}</span></div>
+<a class="scroll-to-element-after" href="#br-characteristics">Характеристики</a>
+<div id="br-characteristics">
+  <div id="br-pr-7">{rows}</div>
+  <button class="br-prs-button" type="button"><span>Всі характеристики</span></button>
+</div>
+<script>
+document.querySelector('button.br-prs-button').addEventListener('click', function () {{
+  var button = this;
+  if (!{lazy}) {{ button.querySelector('span').textContent = 'Приховати'; return; }}
+  setTimeout(function () {{
+    fetch('/api/characteristics/{pid}').then(function (r) {{ return r.text(); }}).then(function (rows) {{
+      document.getElementById('br-pr-7').insertAdjacentHTML('beforeend', rows);
+      button.querySelector('span').textContent = 'Приховати';
+    }});
+  }}, {lazy_delay_ms});
+}});
+</script>
+</body></html>
+"""
+
+ROW = "<div><span>{key}</span><span>{value}</span></div>"
+
+
+def make_products(count: int) -> List[Dict[str, Any]]:
+    """Deterministic catalogue of fake phones."""
+    products = []
+    for pid in range(1, count + 1):
+        brand = BRANDS[pid % len(BRANDS)]
+        color = COLORS[pid % len(COLORS)]
+        memory = MEMORY_SIZES[pid % len(MEMORY_SIZES)]
+        name = f"Смартфон {brand} Phone {pid} {memory}GB {color}"
+        products.append({
+            "pid": pid,
+            "slug": f"fake-phone-{pid}-p{100000 + pid}",
+            "name": name,
+            "sku": f"FAKE{pid:06d}",
+            "price": 5000 + pid * 10,
+            "reviews": pid % 37,
+            "characteristics": {
+                "Виробник": brand,
+                "Модель": f"{brand} Phone {pid}",
+                "Колір": color,
+                "Вбудована пам'ять": f"{memory} ГБ",
+                "Діагональ екрану": f"{6.1 + (pid % 6) / 10:.1f}\"",
+                "Роздільна здатність екрану": "2532x1170",
+                "Оперативна пам'ять": f"{4 + pid % 3 * 2} ГБ",
+                "Серія": f"Series {pid % 50}",
+                "Гарантія": "12 міс.",
+            },
+        })
+    return products
+
+
+class FakeBrainSite:
+    """Threaded local HTTP server with the fake pages.
+
+    Args:
+        products: Number of products in the catalogue.
+        latency: Seconds every response is delayed by.
+        lazy_delay: Seconds before search cards and extra characteristics
+            are inserted by JavaScript; 0 renders everything server-side.
+        port: Port to listen on (0 picks a free one).
+    """
+
+    def __init__(self, products: int = 50, latency: float = 0.0, lazy_delay: float = 0.0, port: int = 0) -> None:
+        self.products = make_products(products)
+        self.by_slug = {product["slug"]: product for product in self.products}
+        self.by_pid = {product["pid"]: product for product in self.products}
+        self.latency = latency
+        self.lazy_delay = lazy_delay
+        self.requests = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def home_url(self) -> str:
+        return self.base_url + "/"
+
+    def product_url(self, product: Dict[str, Any]) -> str:
+        return f"{self.base_url}/ukr/{product['slug']}.html"
+
+    def start(self) -> "FakeBrainSite":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-brain", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeBrainSite":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def search(self, query: str) -> List[Dict[str, Any]]:
+        """Products whose name has every query word (case-insensitive)."""
+        words = set(query.casefold().split())
+        return [product for product in self.products if words <= set(product["name"].casefold().split())]
+
+    def render_cards(self, products: List[Dict[str, Any]]) -> str:
+        return "\n".join(
+            CARD.format(
+                pid=product["pid"],
+                slug=product["slug"],
+                name=html.escape(product["name"]),
+                price=f"{product['price']:,}".replace(",", " "),
+            )
+            for product in products
+        )
+
+    def render_product(self, product: Dict[str, Any]) -> str:
+        jsonld = {
+            "@context": "https://schema.org",
+            "@type": "Product",
+            "name": product["name"],
+            "sku": product["sku"],
+            "description": f"Опис товару {product['name']}",
+            "image": [f"{self.base_url}/img/{product['pid']}.jpg"],
+            "brand": {"@type": "Brand", "name": product["characteristics"]["Виробник"]},
+            "offers": {"@type": "Offer", "price": str(product["price"]), "priceCurrency": "UAH"},
+        }
+        rows = list(product["characteristics"].items())
+        if self.lazy_delay > 0:
+            rows = rows[:VISIBLE_ROWS]
+        return PRODUCT_PAGE.format(
+            base=self.base_url,
+            slug=product["slug"],
+            pid=product["pid"],
+            name=html.escape(product["name"]),
+            reviews=product["reviews"],
+            jsonld=json.dumps(jsonld, ensure_ascii=False),
+            rows="".join(ROW.format(key=html.escape(key), value=html.escape(value)) for key, value in rows),
+            lazy="true" if self.lazy_delay > 0 else "false",
+            lazy_delay_ms=int(self.lazy_delay * 1000),
+        )
+
+    def render_extra_rows(self, product: Dict[str, Any]) -> str:
+        rows = list(product["characteristics"].items())[VISIBLE_ROWS:]
+        return "".join(ROW.format(key=html.escape(key), value=html.escape(value)) for key, value in rows)
+
+    def _handler_class(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                site.requests += 1
+                if site.latency:
+                    time.sleep(site.latency)
+                parts = urlsplit(self.path)
+                path = parts.path
+                if path == "/":
+                    self._send(200, HOME_PAGE.format(cards=site.render_cards(site.products[:4])))
+                elif path.rstrip("/") == "/search":
+                    query = parse_qs(parts.query).get("Search", [""])[0]
+                    cards = site.render_cards(site.search(query))
+                    lazy = site.lazy_delay > 0
+                    self._send(200, SEARCH_PAGE.format(
+                        query=html.escape(query),
+                        cards="" if lazy else cards,
+                        lazy_cards=json.dumps(cards if lazy else ""),
+                        lazy_delay_ms=int(site.lazy_delay * 1000),
+                    ))
+                elif path.startswith("/ukr/") and path.endswith(".html") and path[5:-5] in site.by_slug:
+                    self._send(200, site.render_product(site.by_slug[path[5:-5]]))
+                elif path.startswith("/api/characteristics/") and path.rsplit("/", 1)[1].isdigit():
+                    product = site.by_pid.get(int(path.rsplit("/", 1)[1]))
+                    if product is None:
+                        self._send(404, "Not found")
+                    else:
+                        self._send(200, site.render_extra_rows(product))
+                elif path.startswith("/img/"):
+                    self._send(200, "", content_type="image/jpeg")
+                else:
+                    self._send(404, "Not found")
+
+            def _send(self, status: int, body: str, content_type: str = "text/html; charset=utf-8") -> None:
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve fake brain.com.ua pages locally")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--products", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--lazy-delay", type=float, default=0.0, help="Seconds before lazy content is inserted")
+    args = parser.parse_args()
+
+    site = FakeBrainSite(args.products, args.latency, args.lazy_delay, args.port)
+    print(f"Serving {len(site.products)} fake products at {site.home_url} (Ctrl+C to stop)")
+    site.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        site.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,56 @@
-"""Find product on brain.com.ua and get URL of first result."""
+"""Find products on brain.com.ua: first result of a search, or every card of a category/search listing."""
 from load_django import *  # noqa: F401,F403 - initialize Django
 from parser_app.models import *  # noqa: F401,F403 - models may be needed later
 import argparse
-from dataclasses import dataclass
-from typing import Optional
-
-from selenium import webdriver
-from selenium.common.exceptions import (
-    TimeoutException,
-    NoSuchElementException,
-    ElementClickInterceptedException,
-    ElementNotInteractableException,
-)
-from selenium.webdriver.chrome.options import Options
+import json
+from dataclasses import asdict, dataclass
+from functools import partial
+from pathlib import Path
+from typing import Iterator, Optional
+
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
-import time
-
 
-SEARCH_INPUT_SELECTOR = (By.CSS_SELECTOR, "input.quick-search-input")
-SEARCH_BUTTON_SELECTOR = (By.CSS_SELECTOR, "input.qsr-submit")
-FIRST_RESULT_SELECTOR = (By.CSS_SELECTOR, ".br-pp.br-pp-ex.goods-block__item[data-pid]")
+from browser import build_driver
+from driver_pool import DriverPool, borrow_driver
+from rate_limit import DEFAULT_RATE_LIMIT_PATH, RateLimiter, load_page
+from search import CARD_PRICE_CSS, parse_price, search_results
+from search_cache import SearchCache
+from waits import wait_report, wait_until
+
+
+CARD_SELECTOR = (By.CSS_SELECTOR, ".goods-block__item[data-pid]")
+
+# Cards from index arguments[0] on as [pid, href, price text], plus the total card count
+CARDS_JS = """
+var priceCss = arguments[1], cards = document.querySelectorAll('.goods-block__item[data-pid]'), out = [];
+for (var i = arguments[0]; i < cards.length; i++) {
+    var card = cards[i];
+    var link = card.querySelector("a[href*='/ukr/']") || card.querySelector('a[href]');
+    var priceEl = card.querySelector(priceCss);
+    var price = priceEl ? (priceEl.getAttribute('content') || priceEl.getAttribute('data-price') || priceEl.textContent) : null;
+    out.push([card.getAttribute('data-pid'), link ? link.href : null, price]);
+}
+return [cards.length, out];
+"""
+CARD_COUNT_JS = "return document.querySelectorAll('.goods-block__item[data-pid]').length;"
+# Visible, enabled "show more" control (by class, then by label), or null
+SHOW_MORE_JS = """
+var el = document.querySelector(".br-pagination-more, .show-more, .more-goods, [data-action='show-more']");
+if (!el) {
+    var candidates = document.querySelectorAll('button, a');
+    for (var i = 0; i < candidates.length; i++) {
+        if (/Показати ще|Показать еще/i.test(candidates[i].textContent)) { el = candidates[i]; break; }
+    }
+}
+return el && el.offsetParent !== null && !el.disabled ? el : null;
+"""
+NEXT_PAGE_JS = """
+var next = document.querySelector("link[rel='next'], a[rel='next'], .br-pagination .next a, .pagination .next a, li.next a");
+return next ? (next.href || next.getAttribute('href')) : null;
+"""
 
 
 @dataclass
@@ -29,97 +58,170 @@ class SearchResult:
     url: str
 
 
-def build_driver() -> webdriver.Chrome:
-    options = Options()
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_argument("--start-maximized")
-    # With UI: headless mode not used
-    return webdriver.Chrome(options=options)
-
-
-def find_product_url(query: str, timeout: int = 20) -> Optional[SearchResult]:
-    driver = build_driver()
-    try:
-        driver.get("https://brain.com.ua/")
+@dataclass
+class ListingItem:
+    pid: str
+    url: str
+    listing_price: Optional[float]
+
+
+def find_product_url(
+    query: str,
+    timeout: int = 20,
+    pool: Optional[DriverPool] = None,
+    cache: Optional[SearchCache] = None,
+    refresh_cache: bool = False,
+    limiter: Optional[RateLimiter] = None,
+) -> Optional[SearchResult]:
+    """Resolve query to the first search result, answering from cache when possible.
+
+    refresh_cache skips the cache lookup but still stores the fresh result.
+    """
+    if cache is not None and not refresh_cache:
+        cached_url = cache.get(query)
+        if cached_url:
+            return SearchResult(url=cached_url)
+    result = _search_first_result(query, timeout, pool, limiter)
+    if cache is not None and result:
+        cache.set(query, result.url)
+    return result
+
+
+def _search_first_result(
+    query: str, timeout: int, pool: Optional[DriverPool], limiter: Optional[RateLimiter] = None
+) -> Optional[SearchResult]:
+    # The card link is the product URL: no need to open the product page
+    candidates = search_results(query, limit=1, timeout=timeout, pool=pool, limiter=limiter)
+    return SearchResult(url=candidates[0].url) if candidates else None
+
+
+def crawl_listings(
+    start_url: str,
+    timeout: int = 20,
+    pool: Optional[DriverPool] = None,
+    max_pages: Optional[int] = None,
+    limiter: Optional[RateLimiter] = None,
+) -> Iterator[ListingItem]:
+    """Yield every product card of a category or search listing, page by page.
+
+    On each page the cards are read in one script call; "show more" blocks
+    are clicked until no new cards load, then the next-page link is followed.
+    Items are yielded as soon as their page is read, deduplicated by pid. The
+    browser stays borrowed from pool while the generator is alive.
+
+    Args:
+        start_url: Category or search results URL.
+        timeout: Seconds to wait for cards and for each "show more" load.
+        pool: Driver pool to borrow the browser from.
+        max_pages: Stop after this many listing pages.
+        limiter: Shared per-host rate limiter for listing page loads.
+    """
+    seen_pids = set()
+    visited_pages = set()
+    with borrow_driver(pool, build_driver) as driver:
         wait = WebDriverWait(driver, timeout)
-        time.sleep(2.0)
-
-        # Wait for search input to be present and visible
-        search_input = wait.until(EC.presence_of_element_located(SEARCH_INPUT_SELECTOR))
-        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", search_input)
-        time.sleep(0.5)
-        
-        # Click to focus
-        try:
-            search_input.click()
-        except (ElementNotInteractableException, ElementClickInterceptedException):
-            driver.execute_script("arguments[0].click();", search_input)
-        
-        time.sleep(0.3)
-        
-        # Clear and send keys using JavaScript as fallback
-        try:
-            search_input.clear()
-        except (ElementNotInteractableException, ElementClickInterceptedException):
-            pass
-        
-        # Use JavaScript to set value if send_keys fails
-        try:
-            search_input.send_keys(query)
-        except (ElementNotInteractableException, ElementClickInterceptedException):
-            driver.execute_script("arguments[0].value = arguments[1];", search_input, query)
-            # Trigger input event
-            driver.execute_script("arguments[0].dispatchEvent(new Event('input', { bubbles: true }));", search_input)
-        
-        time.sleep(0.5)
-
-        search_button = wait.until(EC.element_to_be_clickable(SEARCH_BUTTON_SELECTOR))
-        try:
-            search_button.click()
-        except (ElementNotInteractableException, ElementClickInterceptedException):
-            driver.execute_script("arguments[0].click();", search_button)
-        
-        time.sleep(2.0)  # Wait for search results to load
-
-        # Wait for first product in results and click on it
-        first_result = wait.until(EC.presence_of_element_located(FIRST_RESULT_SELECTOR))
-        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", first_result)
-        time.sleep(0.5)
-        
-        # Get the link from the first product card
-        try:
-            product_link = first_result.find_element(By.CSS_SELECTOR, "a[href*='/ukr/']")
-            product_url = product_link.get_attribute("href")
-            if product_url:
-                driver.get(product_url)
-                time.sleep(1.0)
-                return SearchResult(url=driver.current_url)
-        except (NoSuchElementException, AttributeError):
-            pass
-        
-        # Fallback: try to click on the card itself
-        try:
-            first_result.click()
-        except (ElementNotInteractableException, ElementClickInterceptedException):
-            driver.execute_script("arguments[0].click();", first_result)
-
-        wait.until(lambda drv: drv.current_url != "https://brain.com.ua/")
-        return SearchResult(url=driver.current_url)
-    finally:
-        driver.quit()
+        page_url = start_url
+        while page_url and page_url not in visited_pages:
+            if max_pages is not None and len(visited_pages) >= max_pages:
+                break
+            visited_pages.add(page_url)
+            load_page(driver, page_url, limiter)
+            try:
+                wait_until("listings:cards", wait, EC.presence_of_element_located(CARD_SELECTOR))
+            except TimeoutException:
+                print(f"No product cards on {page_url}")
+                break
+
+            offset = 0
+            while True:
+                total, cards = driver.execute_script(CARDS_JS, offset, CARD_PRICE_CSS)
+                offset = total
+                for pid, url, price_text in cards:
+                    if not pid or not url or pid in seen_pids:
+                        continue
+                    seen_pids.add(pid)
+                    yield ListingItem(pid=pid, url=url, listing_price=parse_price(price_text))
+
+                show_more = driver.execute_script(SHOW_MORE_JS)
+                if not show_more:
+                    break
+                driver.execute_script("arguments[0].click();", show_more)
+                try:
+                    wait_until("listings:show-more", wait, lambda drv: drv.execute_script(CARD_COUNT_JS) > total)
+                except TimeoutException:
+                    break
+
+            page_url = driver.execute_script(NEXT_PAGE_JS)
+
+
+def crawl_main(args: argparse.Namespace, limiter: Optional[RateLimiter] = None) -> None:
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with DriverPool(partial(build_driver, lean=args.lean)) as pool, output_path.open("w", encoding="utf-8") as output:
+        for item in crawl_listings(args.crawl, timeout=args.timeout, pool=pool, max_pages=args.max_pages, limiter=limiter):
+            output.write(json.dumps(asdict(item), ensure_ascii=False) + "\n")
+            output.flush()
+            count += 1
+            if count % 100 == 0:
+                print(f"{count} products listed")
+    print(f"Listed {count} products -> {output_path}")
+    print("\n=== Wait Report ===")
+    print(wait_report.format())
 
 
 def main() -> None:
-    parser = argparse.ArgumentParser(description="Find first product by name.")
+    parser = argparse.ArgumentParser(description="Find first product by name, or crawl every product of a listing.")
     parser.add_argument("query", nargs="?", default="Apple iPhone 15 128GB Black", help="Search query")
+    parser.add_argument("--lean", action="store_true", help="Headless browser with images, fonts and analytics blocked")
+    parser.add_argument("--no-cache", action="store_true", help="Do not use the query -> URL cache")
+    parser.add_argument("--refresh-cache", action="store_true", help="Search again and overwrite the cached URL")
+    parser.add_argument("--crawl", help="Category or search URL: list every product card across all pages")
+    parser.add_argument("--max-pages", type=int, help="Crawl mode: stop after this many listing pages")
+    parser.add_argument("--top", type=int, help="Print the top N search results (pid, url, title, price) instead of one URL")
+    parser.add_argument("--timeout", type=int, default=20, help="Element wait timeout")
+    parser.add_argument(
+        "--rate",
+        type=float,
+        help=f"Max requests/sec per host, shared with other scrapers via {DEFAULT_RATE_LIMIT_PATH.name}; lowered automatically on slow or blocked pages",
+    )
+    parser.add_argument("--burst", type=float, default=3.0, help="Requests allowed back to back before --rate applies")
+    parser.add_argument(
+        "--output",
+        default=str(Path(__file__).resolve().parent.parent / "results" / "listings.jsonl"),
+        help="Crawl mode: JSONL file for (pid, url, listing_price) records",
+    )
     args = parser.parse_args()
+    limiter = RateLimiter(rate=args.rate, burst=args.burst) if args.rate else None
+
+    if args.crawl:
+        crawl_main(args, limiter)
+        return
+
+    if args.top:
+        with DriverPool(partial(build_driver, lean=args.lean)) as pool:
+            candidates = search_results(args.query, limit=args.top, timeout=args.timeout, pool=pool, limiter=limiter)
+        for candidate in candidates:
+            print(json.dumps(asdict(candidate), ensure_ascii=False))
+        if not candidates:
+            print("Failed to get results.")
+        return
 
-    result = find_product_url(args.query)
+    cache = None if args.no_cache else SearchCache()
+    with DriverPool(partial(build_driver, lean=args.lean)) as pool:
+        result = find_product_url(
+            args.query, timeout=args.timeout, pool=pool, cache=cache, refresh_cache=args.refresh_cache, limiter=limiter
+        )
+    if cache is not None:
+        print(f"Search cache: {cache.stats()}")
+        cache.close()
     if not result:
         print("Failed to get result.")
         return
 
     print(f"Found product URL: {result.url}")
+    print("\n=== Wait Report ===")
+    print(wait_report.format())
 
 
 if __name__ == "__main__":
@@ -2,140 +2,117 @@
 from load_django import *  # noqa: F401,F403 - initialize Django
 from parser_app.models import *  # noqa: F401,F403 - access to models
 import argparse
-import json
-import re
+import http.client
+import math
+import multiprocessing
+import multiprocessing.pool
+import multiprocessing.util
+import os
+import sqlite3
+import zlib
+from functools import partial
 from pathlib import Path
 from pprint import pprint
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
+from django.db import DatabaseError
 from selenium import webdriver
 from selenium.common.exceptions import (
+    JavascriptException,
     TimeoutException,
     NoSuchElementException,
     ElementClickInterceptedException,
     ElementNotInteractableException,
 )
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 import time
 
+from browser import build_driver
+from db_writer import BulkProductWriter, content_hash, mark_seen, product_kwargs, upsert_products
+from driver_pool import DriverPool, borrow_driver
+from frontier import Frontier, enqueue, frontier_stats
+from html_extract import extract_from_html
+from http_fetch import HttpClient, NotModified
+from metrics import metrics
+from product_fields import build_product_data, load_jsonld
+from rate_limit import DEFAULT_RATE_LIMIT_PATH, BlockedError, RateLimiter, load_page, looks_blocked
+from result_sink import add_sink_arguments, sink_from_args
+from search import search_results
+from search_cache import SearchCache
+from snapshot_store import DEFAULT_SNAPSHOT_DIR, SnapshotStore
+from waits import wait_dom_changed, wait_dom_settled, wait_report, wait_until
+
 JSONLD_SELECTOR = (By.CSS_SELECTOR, 'script[type="application/ld+json"]')
 REVIEWS_SELECTOR = (By.CSS_SELECTOR, ".comments-average-rating-stars + .br-pp-r span")
 REVIEWS_ALT_SELECTOR = (By.CSS_SELECTOR, "span.forbid-click.reviews-count span")
 # Use ID-based selector for characteristics container
 CHAR_CONTAINER_SELECTOR = (By.ID, "br-pr-7")
 CHAR_TAB_SELECTOR = (By.CSS_SELECTOR, "a.scroll-to-element-after[href='#br-characteristics']")
-SEARCH_INPUT_SELECTOR = (By.CSS_SELECTOR, "input.quick-search-input")
-# Alternative selector for search input (relative CSS selector instead of absolute XPath)
-SEARCH_INPUT_ALT_SELECTOR = (By.CSS_SELECTOR, "header form input.quick-search-input, header input[type='text']")
-SEARCH_BUTTON_SELECTOR = (By.CSS_SELECTOR, "input.qsr-submit")
-FIRST_RESULT_SELECTOR = (By.CSS_SELECTOR, ".br-pp.br-pp-ex.goods-block__item[data-pid]")
-# More stable selector for first product card in results
-FIRST_CARD_SELECTOR = ".br-pp.br-pp-ex.goods-block__item.br-pcg.br-series"
-
-
-def build_driver() -> webdriver.Chrome:
-    options = Options()
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_argument("--start-maximized")
-    return webdriver.Chrome(options=options)
+# Batch modes: how often the result loop runs its idle hook while waiting on slow items
+IDLE_SECONDS = 1.0
+# outerHTML of the (expanded) characteristics container, stored with page snapshots
+CHARACTERISTICS_HTML_JS = """
+var el = document.getElementById('br-pr-7') || document.getElementById('br-characteristics');
+return el ? el.outerHTML : null;
+"""
+# Walks the characteristics container in the page and returns [[key, value], ...]
+# in one round trip; same row/fallback rules as the per-element loop below
+CHARACTERISTICS_JS = """
+var container = arguments[0];
+function text(el) { return el ? (el.innerText || '').trim() : ''; }
+var divs = Array.prototype.slice.call(container.querySelectorAll('div'));
+var rows = divs.filter(function (div) { return div.querySelector('span:nth-child(1)'); });
+if (!rows.length) { rows = divs; }
+var pairs = [];
+rows.forEach(function (row) {
+    var rowText = text(row);
+    if (!rowText) { return; }
+    var key = text(row.querySelector('span:nth-child(1)') || row.querySelector('span:first-of-type'));
+    var value = text(row.querySelector('span:nth-child(2)') || row.querySelector('span:nth-of-type(2)'));
+    if (!value) {
+        value = Array.prototype.map.call(row.querySelectorAll('a'), text).filter(Boolean).join(', ');
+    }
+    if (key && !value) {
+        var colon = rowText.indexOf(':');
+        if (colon >= 0 && rowText.slice(0, colon).trim() === key) { value = rowText.slice(colon + 1).trim(); }
+    }
+    pairs.push([key, value]);
+});
+return pairs;
+"""
 
 
-def find_product_url(query: str, timeout: int = 20) -> Optional[str]:
-    driver = build_driver()
-    try:
-        driver.get("https://brain.com.ua/")
-        wait = WebDriverWait(driver, timeout)
-        time.sleep(2.0)
+def find_product_url(
+    query: str,
+    timeout: int = 20,
+    pool: Optional[DriverPool] = None,
+    cache: Optional[SearchCache] = None,
+    refresh_cache: bool = False,
+    limiter: Optional[RateLimiter] = None,
+) -> Optional[str]:
+    """Resolve query to a product URL, answering from cache when possible.
 
-        # Wait for search input to be present and visible
-        try:
-            search_input = wait.until(EC.presence_of_element_located(SEARCH_INPUT_SELECTOR))
-        except (TimeoutException, NoSuchElementException):
-            try:
-                search_input = wait.until(EC.presence_of_element_located(SEARCH_INPUT_ALT_SELECTOR))
-            except (TimeoutException, NoSuchElementException):
-                # Last resort: try to find any input in header
-                search_input = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "header input[type='text']")))
-        
-        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", search_input)
-        time.sleep(0.5)
-        
-        # Click to focus
-        try:
-            search_input.click()
-        except (ElementNotInteractableException, ElementClickInterceptedException):
-            driver.execute_script("arguments[0].click();", search_input)
-        
-        time.sleep(0.3)
-        
-        # Clear and send keys using JavaScript as fallback
-        try:
-            search_input.clear()
-        except (ElementNotInteractableException, ElementClickInterceptedException):
-            pass
-        
-        # Use JavaScript to set value if send_keys fails
-        try:
-            search_input.send_keys(query)
-        except (ElementNotInteractableException, ElementClickInterceptedException):
-            driver.execute_script("arguments[0].value = arguments[1];", search_input, query)
-            # Trigger input event
-            driver.execute_script("arguments[0].dispatchEvent(new Event('input', { bubbles: true }));", search_input)
-        
-        time.sleep(0.5)
-
-        search_button = wait.until(EC.element_to_be_clickable(SEARCH_BUTTON_SELECTOR))
-        try:
-            search_button.click()
-        except (ElementNotInteractableException, ElementClickInterceptedException):
-            driver.execute_script("arguments[0].click();", search_button)
-        
-        time.sleep(2.0)  # Wait for search results to load
-
-        # Wait for first product in results and click on it
-        first_result = wait.until(EC.presence_of_element_located(FIRST_RESULT_SELECTOR))
-        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", first_result)
-        time.sleep(0.5)
-        
-        # Get the link from the first product card
-        try:
-            product_link = first_result.find_element(By.CSS_SELECTOR, "a[href*='/ukr/']")
-            product_url = product_link.get_attribute("href")
-            if product_url:
-                driver.get(product_url)
-                time.sleep(1.0)
-                return driver.current_url
-        except (NoSuchElementException, AttributeError):
-            pass
-        
-        # Fallback: try to click on the card itself
-        try:
-            first_result.click()
-        except (ElementNotInteractableException, ElementClickInterceptedException):
-            driver.execute_script("arguments[0].click();", first_result)
+    refresh_cache skips the cache lookup but still stores the fresh result.
+    """
+    if cache is not None and not refresh_cache:
+        cached_url = cache.get(query)
+        if cached_url:
+            return cached_url
+    with metrics.span("search", query=query):
+        url = _search_product_url(query, timeout, pool, limiter)
+    if cache is not None and url:
+        cache.set(query, url)
+    return url
 
-        wait.until(lambda drv: "/search" not in drv.current_url)
-        return driver.current_url
-    finally:
-        driver.quit()
 
-
-def load_jsonld(blocks: List[str]) -> Optional[Dict[str, Any]]:
-    for block in blocks:
-        try:
-            data = json.loads(block)
-        except json.JSONDecodeError:
-            continue
-        if isinstance(data, list):
-            for item in data:
-                if isinstance(item, dict) and item.get("@type") == "Product":
-                    return item
-        if isinstance(data, dict) and data.get("@type") == "Product":
-            return data
-    return None
+def _search_product_url(
+    query: str, timeout: int, pool: Optional[DriverPool], limiter: Optional[RateLimiter] = None
+) -> Optional[str]:
+    # The first card's link is the product URL: the product page is opened once, by parse_product
+    candidates = search_results(query, limit=1, timeout=timeout, pool=pool, limiter=limiter)
+    return candidates[0].url if candidates else None
 
 
 def expand_characteristics(driver: webdriver.Chrome, timeout: int) -> None:
@@ -144,14 +121,15 @@ def expand_characteristics(driver: webdriver.Chrome, timeout: int) -> None:
     
     # Step 1: Click on characteristics tab
     try:
-        tab = wait.until(EC.element_to_be_clickable(CHAR_TAB_SELECTOR))
+        tab = wait_until("char:tab", wait, EC.element_to_be_clickable(CHAR_TAB_SELECTOR))
         driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", tab)
-        time.sleep(0.3)
         try:
             tab.click()
         except (ElementNotInteractableException, ElementClickInterceptedException):
             driver.execute_script("arguments[0].click();", tab)
-        time.sleep(1.0)  # Wait for characteristics section to load
+        # Wait for characteristics section to load
+        section = wait_until("char:section", wait, EC.presence_of_element_located(CHAR_CONTAINER_SELECTOR))
+        wait_dom_settled(driver, "char:section-settled", root=section, timeout=timeout)
     except (TimeoutException, NoSuchElementException):
         pass
     
@@ -162,7 +140,7 @@ def expand_characteristics(driver: webdriver.Chrome, timeout: int) -> None:
         
         # Method 1: Find by class and check text
         try:
-            buttons = wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "button.br-prs-button")))
+            buttons = wait_until("char:button", wait, EC.presence_of_all_elements_located((By.CSS_SELECTOR, "button.br-prs-button")))
             for btn in buttons:
                 if btn.is_displayed():
                     btn_text = btn.text.strip()
@@ -188,9 +166,10 @@ def expand_characteristics(driver: webdriver.Chrome, timeout: int) -> None:
                 pass
         
         if button:
+            # Watched for the rows the click loads
+            containers = driver.find_elements(*CHAR_CONTAINER_SELECTOR) or driver.find_elements(By.ID, "br-characteristics")
             # Scroll to button
-            driver.execute_script("arguments[0].scrollIntoView({block: 'center', behavior: 'smooth'});", button)
-            time.sleep(0.3)
+            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", button)
             # Try to click
             try:
                 if button.is_displayed() and button.is_enabled():
@@ -199,7 +178,11 @@ def expand_characteristics(driver: webdriver.Chrome, timeout: int) -> None:
                     driver.execute_script("arguments[0].click();", button)
             except (ElementNotInteractableException, ElementClickInterceptedException):
                 driver.execute_script("arguments[0].click();", button)
-            time.sleep(1.5)  # Wait for characteristics to expand
+            # Wait for characteristics to expand (rows may be fetched via XHR)
+            if containers:
+                wait_dom_changed(driver, "char:expand", containers[0], timeout=min(timeout, 10))
+            else:
+                wait_dom_settled(driver, "char:expand", timeout=timeout)
             print("Successfully clicked 'All characteristics' button")
         else:
             print("Warning: 'All characteristics' button not found")
@@ -219,7 +202,7 @@ def _first_text(element) -> str:
     return ""
 
 
-def extract_characteristics(driver: webdriver.Chrome, timeout: int) -> Dict[str, str]:
+def extract_characteristics(driver: webdriver.Chrome, timeout: int, bulk: bool = True) -> Dict[str, str]:
     """Parse all characteristics from product page.
     
     Finds characteristics container (#br-pr-7 or #br-characteristics)
@@ -227,6 +210,10 @@ def extract_characteristics(driver: webdriver.Chrome, timeout: int) -> Dict[str,
     
     Uses CSS selectors span:nth-child(1) and span:nth-child(2) for precise selection.
     Also tries to expand any "Show more" buttons to reveal hidden characteristics.
+
+    With bulk=True the whole table is read by one execute_script call
+    (CHARACTERISTICS_JS) instead of several WebDriver round trips per row;
+    the per-element loop is kept as a fallback.
     
     Returns:
         Dict[str, str]: Dictionary with all characteristics {key: value}
@@ -237,7 +224,7 @@ def extract_characteristics(driver: webdriver.Chrome, timeout: int) -> Dict[str,
     # Try to find characteristics container
     container = None
     try:
-        container = wait.until(EC.presence_of_element_located(CHAR_CONTAINER_SELECTOR))
+        container = wait_until("char:container", wait, EC.presence_of_element_located(CHAR_CONTAINER_SELECTOR))
     except (TimeoutException, NoSuchElementException):
         # Try alternative selector
         try:
@@ -250,21 +237,23 @@ def extract_characteristics(driver: webdriver.Chrome, timeout: int) -> Dict[str,
     
     # Scroll to container to ensure all characteristics are visible
     try:
-        driver.execute_script("arguments[0].scrollIntoView({block: 'start', behavior: 'smooth'});", container)
-        time.sleep(0.5)  # Wait for scroll to complete
+        driver.execute_script("arguments[0].scrollIntoView({block: 'start'});", container)
     except (AttributeError, TypeError):
         pass
     
     # Try to expand any "Show more" or similar buttons inside container
     try:
         expand_buttons = container.find_elements(By.CSS_SELECTOR, "a[class*='more'], button[class*='more'], a[class*='expand'], button[class*='expand']")
+        clicked = False
         for btn in expand_buttons:
             try:
                 if btn.is_displayed():
                     driver.execute_script("arguments[0].click();", btn)
-                    time.sleep(0.3)
+                    clicked = True
             except (ElementNotInteractableException, ElementClickInterceptedException, AttributeError):
                 pass
+        if clicked:
+            wait_dom_settled(driver, "char:show-more", root=container, timeout=timeout)
     except (NoSuchElementException, AttributeError):
         pass
     
@@ -278,7 +267,8 @@ def extract_characteristics(driver: webdriver.Chrome, timeout: int) -> Dict[str,
         
         while scroll_count < max_scrolls:
             driver.execute_script("arguments[0].scrollTop = arguments[1];", container, scroll_position)
-            time.sleep(0.2)
+            # Lazy-loaded rows show up as DOM mutations under the container
+            wait_dom_settled(driver, "char:lazy-load", root=container, quiet=0.1, timeout=timeout)
             new_height = driver.execute_script("return arguments[0].scrollHeight;", container)
             if new_height == last_height and scroll_position > 0:
                 break
@@ -288,10 +278,21 @@ def extract_characteristics(driver: webdriver.Chrome, timeout: int) -> Dict[str,
         
         # Scroll back to top
         driver.execute_script("arguments[0].scrollTop = 0;", container)
-        time.sleep(0.2)
     except (AttributeError, TypeError):
         pass
     
+    if bulk:
+        try:
+            for key, value in driver.execute_script(CHARACTERISTICS_JS, container):
+                key = ' '.join(key.split())
+                value = ' '.join(value.split())
+                if key:
+                    characteristics[key] = value
+            return characteristics
+        except (JavascriptException, TypeError, ValueError) as e:
+            print(f"Bulk characteristics extraction failed, falling back to per-element: {e}")
+            characteristics = {}
+
     # Get all div elements that contain characteristics
     # Strategy: find divs that have span:nth-child(1) (key) and span:nth-child(2) (value)
     rows = []
@@ -388,80 +389,77 @@ def extract_characteristics(driver: webdriver.Chrome, timeout: int) -> Dict[str,
     return characteristics
 
 
-def derive_field_from_characteristics(characteristics: Dict[str, str], candidates: Tuple[str, ...]) -> Optional[str]:
-    """Find a characteristic value by matching key candidates."""
-    for key, value in characteristics.items():
-        key_lower = key.lower()
-        if any(candidate.lower() in key_lower for candidate in candidates):
-            return value if value else None
-    return None
-
-
-def parse_product(url: str, timeout: int = 25) -> Dict[str, Any]:
-    missing_fields: List[str] = []
-
-    def mark_missing(field_name: str, is_missing: bool) -> None:
-        if is_missing and field_name not in missing_fields:
-            missing_fields.append(field_name)
-
-    driver = build_driver()
-    try:
-        driver.get(url)
+def parse_product(
+    url: str,
+    timeout: int = 25,
+    pool: Optional[DriverPool] = None,
+    snapshots: Optional[SnapshotStore] = None,
+    limiter: Optional[RateLimiter] = None,
+) -> Dict[str, Any]:
+    with borrow_driver(pool, build_driver) as driver:
+        with metrics.span("page_load", url=url):
+            # Raises BlockedError on challenge pages before any selector wait starts
+            load_page(driver, url, limiter)
         wait = WebDriverWait(driver, timeout)
 
         # Extract JSON-LD blocks with error handling
-        jsonld = None
-        try:
-            jsonld_blocks = [element.get_attribute("innerHTML") for element in wait.until(EC.presence_of_all_elements_located(JSONLD_SELECTOR))]
-            jsonld = load_jsonld(jsonld_blocks) or {}
-        except (TimeoutException, NoSuchElementException) as e:
-            print(f"Failed to extract JSON-LD: {e}")
-            jsonld = {}
+        with metrics.span("jsonld"):
+            jsonld = None
+            try:
+                jsonld_blocks = [element.get_attribute("innerHTML") for element in wait_until("product:jsonld", wait, EC.presence_of_all_elements_located(JSONLD_SELECTOR))]
+                jsonld = load_jsonld(jsonld_blocks) or {}
+            except (TimeoutException, NoSuchElementException) as e:
+                print(f"Failed to extract JSON-LD: {e}")
+                jsonld = {}
 
         # Expand all characteristics before parsing
-        expand_characteristics(driver, timeout)
+        with metrics.span("expand_characteristics"):
+            expand_characteristics(driver, timeout)
 
         # Extract characteristics
-        characteristics = {}
-        try:
-            characteristics = extract_characteristics(driver, timeout)
-            if not characteristics:
-                print("Warning: No characteristics found. Trying alternative extraction methods...")
-                # Try to find characteristics in alternative locations
-                try:
-                    alt_container = driver.find_element(By.ID, "br-characteristics")
-                    if alt_container:
-                        # Try alternative extraction
-                        all_text = alt_container.text
-                        if all_text:
-                            print(f"Found text in alternative container: {len(all_text)} characters")
-                except (NoSuchElementException, AttributeError):
-                    pass
-        except (TimeoutException, NoSuchElementException, AttributeError, TypeError, ValueError) as e:
-            print(f"Failed to extract characteristics: {e}")
-            import traceback
-            traceback.print_exc()
+        with metrics.span("extract_characteristics") as span:
             characteristics = {}
+            try:
+                characteristics = extract_characteristics(driver, timeout)
+                if not characteristics:
+                    print("Warning: No characteristics found. Trying alternative extraction methods...")
+                    # Try to find characteristics in alternative locations
+                    try:
+                        alt_container = driver.find_element(By.ID, "br-characteristics")
+                        if alt_container:
+                            # Try alternative extraction
+                            all_text = alt_container.text
+                            if all_text:
+                                print(f"Found text in alternative container: {len(all_text)} characters")
+                    except (NoSuchElementException, AttributeError):
+                        pass
+            except (TimeoutException, NoSuchElementException, AttributeError, TypeError, ValueError) as e:
+                print(f"Failed to extract characteristics: {e}")
+                import traceback
+                traceback.print_exc()
+                characteristics = {}
+            span["rows"] = len(characteristics)
 
         # Extract review count with granular error handling
-        review_count = None
-        try:
-            # Try first selector
+        with metrics.span("reviews"):
+            review_count = None
             try:
-                review_el = wait.until(EC.presence_of_element_located(REVIEWS_SELECTOR))
-                review_text = review_el.text.strip()
-            except (TimeoutException, NoSuchElementException):
-                # Try alternative selector
-                review_el = wait.until(EC.presence_of_element_located(REVIEWS_ALT_SELECTOR))
-                review_text = review_el.text.strip()
+                # Try first selector
+                try:
+                    review_el = wait_until("product:reviews", wait, EC.presence_of_element_located(REVIEWS_SELECTOR))
+                    review_text = review_el.text.strip()
+                except (TimeoutException, NoSuchElementException):
+                    # Try alternative selector
+                    review_el = wait_until("product:reviews", wait, EC.presence_of_element_located(REVIEWS_ALT_SELECTOR))
+                    review_text = review_el.text.strip()
             
-            if review_text and review_text.isdigit():
-                review_count = int(review_text)
-        except (TimeoutException, NoSuchElementException):
-            review_count = None
-        except (ValueError, AttributeError) as e:
-            print(f"Failed to parse review count: {e}")
-            review_count = None
+                if review_text and review_text.isdigit():
+                    review_count = int(review_text)
+            except (TimeoutException, NoSuchElementException):
+                review_count = None
+            except (ValueError, AttributeError) as e:
+                print(f"Failed to parse review count: {e}")
+                review_count = None
 
         # Extract images with error handling
         images = []
@@ -473,143 +471,473 @@ def parse_product(url: str, timeout: int = 25) -> Dict[str, Any]:
             print(f"Failed to extract images: {e}")
             images = []
 
-        # Extract basic fields from JSON-LD with None defaults
-        name = jsonld.get("name") if jsonld else None
-        description = jsonld.get("description") if jsonld else None
-        sku = jsonld.get("sku") if jsonld else None
-        mpn = jsonld.get("mpn") if jsonld else None
-        
-        brand_name = None
-        try:
-            brand = jsonld.get("brand")
-            if isinstance(brand, dict):
-                brand_name = brand.get("name")
-        except (AttributeError, KeyError) as e:
-            print(f"Failed to extract brand: {e}")
-            brand_name = None
-
-        # Extract price and currency
-        price = None
-        currency = "UAH"
+        if snapshots is not None:
+            with metrics.span("snapshot"):
+                # Page source after expansion, so re-extraction sees all characteristics
+                try:
+                    snapshots.put(driver.current_url, driver.page_source, driver.execute_script(CHARACTERISTICS_HTML_JS))
+                except (JavascriptException, OSError, sqlite3.Error) as e:
+                    print(f"Failed to store page snapshot: {e}")
+
+        with metrics.span("build_fields"):
+            return build_product_data(jsonld, characteristics, driver.current_url, review_count, images)
+
+
+def parse_product_http(
+    url: str,
+    client: HttpClient,
+    snapshots: Optional[SnapshotStore] = None,
+    limiter: Optional[RateLimiter] = None,
+    validators: Optional[Dict[str, str]] = None,
+) -> Optional[Dict[str, Any]]:
+    """Parse product from server-rendered HTML without a browser.
+
+    Returns None when the page can't be fetched or lacks the JSON-LD or the
+    characteristics block, so the caller can fall back to Selenium. Raises
+    BlockedError on block/challenge responses: the browser would be blocked too.
+
+    validators (If-None-Match / If-Modified-Since) make the request
+    conditional: a 304 raises NotModified. The dict is updated in place with
+    the validators of a fresh response.
+    """
+    if limiter is not None:
+        limiter.acquire(url)
+    started = time.perf_counter()
+    try:
+        with metrics.span("http_fetch", url=url) as span:
+            response = client.get(url, headers=validators)
+            span["http_status"] = response.status
+    except (OSError, EOFError, zlib.error, http.client.HTTPException) as e:
+        print(f"HTTP fetch failed for {url}: {e}")
+        if limiter is not None:
+            limiter.report(url, time.perf_counter() - started)
+        return None
+    if limiter is not None:
+        blocked = looks_blocked(response.status, response.text)
+        limiter.report(url, time.perf_counter() - started, blocked=blocked)
+        if blocked:
+            raise BlockedError(f"Challenge or block page (HTTP {response.status}) at {url}")
+    if response.status == 304:
+        raise NotModified(url)
+    if validators is not None and response.status == 200:
+        validators.clear()
+        validators.update(response.validators())
+    if response.status != 200:
+        print(f"HTTP fetch returned {response.status} for {url}")
+        return None
+    if snapshots is not None:
+        with metrics.span("snapshot"):
+            try:
+                snapshots.put(response.url, response.text)
+            except (OSError, sqlite3.Error) as e:
+                print(f"Failed to store page snapshot: {e}")
+    with metrics.span("html_extract"):
+        data = extract_from_html(response.text, response.url)
+    if not data["raw_jsonld"] or not data["characteristics"]:
+        return None
+    return data
+
+
+def fetch_product(
+    url: str,
+    timeout: int = 25,
+    pool: Optional[DriverPool] = None,
+    http_client: Optional[HttpClient] = None,
+    snapshots: Optional[SnapshotStore] = None,
+    limiter: Optional[RateLimiter] = None,
+    validators: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """Parse product over plain HTTP when http_client is given, falling back to Selenium.
+
+    validators are passed to parse_product_http (conditional request, NotModified on 304).
+    """
+    with metrics.span("fetch_product", url=url) as span:
+        data = None
+        if http_client is not None:
+            try:
+                data = parse_product_http(url, http_client, snapshots=snapshots, limiter=limiter, validators=validators)
+            except NotModified:
+                # An expected outcome, not a stage error: re-raised below, outside the span
+                span.update(path="http", not_modified=True)
+            else:
+                if data is None:
+                    print("HTTP fast path incomplete, falling back to browser.")
+        if not span.get("not_modified"):
+            span["path"] = "http" if data is not None else "browser"
+            if data is None:
+                data = parse_product(url, timeout=timeout, pool=pool, snapshots=snapshots, limiter=limiter)
+            span["missing_fields"] = data["missing_fields"]
+    if span.get("not_modified"):
+        metrics.count("scrape_not_modified_total")
+        raise NotModified(url)
+    metrics.count("scrape_products_total", path=span["path"])
+    metrics.count_missing_fields(data["missing_fields"])
+    return data
+
+
+def save_product(data: Dict[str, Any]) -> None:
+    """Save product to database, upserting on (sku, url); unchanged products only get last_seen bumped."""
+    upsert_products([data])
+
+
+# Browser pool, HTTP client, search cache and rate limiter owned by a batch worker process (one Chrome per worker)
+_worker_pool: Optional[DriverPool] = None
+_worker_http: Optional[HttpClient] = None
+_worker_cache: Optional[SearchCache] = None
+_worker_refresh_cache = False
+_worker_snapshots: Optional[SnapshotStore] = None
+_worker_limiter: Optional[RateLimiter] = None
+
+
+def _init_batch_worker(
+    use_http: bool = False,
+    lean: bool = False,
+    use_cache: bool = True,
+    refresh_cache: bool = False,
+    snapshot_dir: Optional[str] = None,
+    metrics_log: Optional[str] = None,
+    rate: Optional[float] = None,
+    burst: float = 3.0,
+) -> None:
+    global _worker_pool, _worker_http, _worker_cache, _worker_refresh_cache, _worker_snapshots, _worker_limiter
+    _worker_pool = DriverPool(partial(build_driver, lean=lean), max_size=1)
+    _worker_http = HttpClient() if use_http else None
+    _worker_cache = SearchCache() if use_cache else None
+    _worker_refresh_cache = refresh_cache
+    _worker_snapshots = SnapshotStore(Path(snapshot_dir)) if snapshot_dir else None
+    # All workers share one bucket per host through the SQLite state file
+    _worker_limiter = RateLimiter(rate=rate, burst=burst) if rate else None
+    metrics.configure_log(metrics_log)
+    # Quit Chrome when the worker exits after pool.close()/join()
+    multiprocessing.util.Finalize(_worker_pool, _worker_pool.close, exitpriority=10)
+
+
+def _parse_batch_item(item: str, timeout: int, validators: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Resolve and parse one batch line (URL or search query) inside a worker.
+
+    With validators from an earlier fetch the HTTP path asks for a 304 first;
+    result["validators"] holds the ones to store for the next recrawl.
+    """
+    started = time.perf_counter()
+    wait_report.reset()
+    # Metrics go back to the parent with the result, which merges them
+    metrics.reset()
+    result: Dict[str, Any] = {"input": item, "url": None, "worker": os.getpid(), "data": None, "error": None, "not_modified": False}
+    validators = dict(validators or {})
+    try:
+        target_url = item
+        if not item.startswith(("http://", "https://")):
+            target_url = find_product_url(
+                item,
+                timeout=timeout,
+                pool=_worker_pool,
+                cache=_worker_cache,
+                refresh_cache=_worker_refresh_cache,
+                limiter=_worker_limiter,
+            )
+            if not target_url:
+                raise LookupError("Product not found by given query")
+        result["url"] = target_url
+        result["data"] = fetch_product(
+            target_url,
+            timeout=timeout,
+            pool=_worker_pool,
+            http_client=_worker_http,
+            snapshots=_worker_snapshots,
+            limiter=_worker_limiter,
+            validators=validators,
+        )
+    except NotModified:
+        result["not_modified"] = True
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["elapsed"] = time.perf_counter() - started
+    result["validators"] = validators
+    result["waits"] = wait_report.totals()
+    result["metrics"] = metrics.snapshot()
+    return result
+
+
+def _parse_batch_task(task: Tuple[Any, ...]) -> Dict[str, Any]:
+    return _parse_batch_item(*task)
+
+
+def read_batch_input(path: Path) -> List[str]:
+    """Read URLs or queries, one per line; blank lines and # comments are skipped."""
+    lines = path.read_text(encoding="utf-8").splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith("#")]
+
+
+def _pool_results(pool: multiprocessing.pool.Pool, tasks: List[Tuple[Any, ...]], on_idle: Optional[Callable[[], None]]) -> Iterator[Dict[str, Any]]:
+    """imap_unordered over tasks, calling on_idle every IDLE_SECONDS while no result arrives."""
+    results = pool.imap_unordered(_parse_batch_task, tasks, chunksize=1)
+    while True:
         try:
-            offers = jsonld.get("offers") or {}
-            if isinstance(offers, dict):
-                price = offers.get("price")
-                currency = offers.get("priceCurrency", "UAH")
-        except (AttributeError, KeyError) as e:
-            print(f"Failed to extract price: {e}")
-
-        # Derive fields from characteristics, return None if not found
-        color = derive_field_from_characteristics(characteristics, ("Колір", "колір", "цвет", "Color"))
-        if not color:
-            color = characteristics.get("Колір")
-        
-        memory = derive_field_from_characteristics(characteristics, ("Об'єм пам'яті", "пам", "память", "Memory", "Вбудована пам'ять"))
-        if not memory:
-            memory = characteristics.get("Вбудована пам'ять")
-        
-        screen_size = derive_field_from_characteristics(characteristics, ("Діагональ екрану", "Діагональ", "діагональ", "Диагональ", "Screen", "Display"))
-        if not screen_size:
-            screen_size = characteristics.get("Діагональ екрану")
-        
-        resolution = derive_field_from_characteristics(characteristics, ("Роздільна здатність дисплея", "Роздільна здатність екрану", "роздільна", "Разрешение", "Resolution"))
-        if not resolution:
-            resolution = characteristics.get("Роздільна здатність екрану")
-        
-        # Override brand if found in characteristics
-        # Note: Ukrainian keys (like "Виробник", "Модель") are data from the website, not code
-        if not brand_name and characteristics:
-            brand_name = characteristics.get("Виробник")
-        
-        # Override name with model from characteristics if available
-        if characteristics.get("Модель"):
-            name = characteristics.get("Модель")
-
-        # Simple heuristics if field not found in characteristics
-        if not memory and name:
-            match = re.search(r"(\d+\s?GB)", name, re.IGNORECASE)
-            if match:
-                memory = match.group(1)
-        
-        if not color and name:
-            for candidate in ["Black", "White", "Blue", "Pink", "Green", "Red", "Yellow", "Purple"]:
-                if candidate.lower() in name.lower():
-                    color = candidate
-                    break
-        
-        # Additional search by keywords in all characteristics
-        for key, value in characteristics.items():
-            key_lower = key.lower()
-            if ("діагональ" in key_lower or "диагональ" in key_lower) and not screen_size:
-                screen_size = value
-            if ("розділь" in key_lower or "разреш" in key_lower) and not resolution:
-                resolution = value
-
-        # Build data dictionary with English keys
-        data = {
-            "name": name,
-            "url": driver.current_url,
-            "description": description,
-            "sku": sku,
-            "mpn": mpn,
-            "manufacturer": brand_name,
-            "color": color,
-            "memory": memory,
-            "price": float(price) if price else None,
-            "sale_price": None,
-            "currency": currency or "UAH",
-            "images": images,
-            "rating": None,
-            "review_count": review_count,
-            "screen_size": screen_size,
-            "resolution": resolution,
-            "characteristics": characteristics,
-            "raw_jsonld": jsonld or {},
-        }
-
-        # Mark missing fields including characteristics presence
-        mark_missing("name", not data.get("name"))
-        mark_missing("sku", not data.get("sku"))
-        mark_missing("manufacturer", not data.get("manufacturer"))
-        mark_missing("color", not data.get("color"))
-        mark_missing("memory", not data.get("memory"))
-        mark_missing("screen_size", not data.get("screen_size"))
-        mark_missing("resolution", not data.get("resolution"))
-        mark_missing("characteristics", not data.get("characteristics"))
-        data["missing_fields"] = missing_fields
-        return data
+            yield results.next(timeout=IDLE_SECONDS) if on_idle else next(results)
+        except multiprocessing.TimeoutError:
+            on_idle()
+        except StopIteration:
+            return
+
+
+def run_batch(
+    items: List[str],
+    workers: int,
+    timeout: int,
+    use_http: bool = False,
+    lean: bool = False,
+    use_cache: bool = True,
+    refresh_cache: bool = False,
+    snapshot_dir: Optional[str] = None,
+    metrics_log: Optional[str] = None,
+    rate: Optional[float] = None,
+    burst: float = 3.0,
+    on_idle: Optional[Callable[[], None]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Parse items across a process pool, yielding results as soon as they finish.
+
+    on_idle is called in this process while slow items hold up results (e.g. BulkProductWriter.tick).
+    """
+    pool = multiprocessing.Pool(
+        processes=workers,
+        initializer=_init_batch_worker,
+        initargs=(use_http, lean, use_cache, refresh_cache, snapshot_dir, metrics_log, rate, burst),
+    )
+    try:
+        tasks = [(item, timeout) for item in items]
+        yield from _pool_results(pool, tasks, on_idle)
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
     finally:
-        driver.quit()
+        pool.join()
 
 
-def save_product(data: Dict[str, Any]) -> None:
-    """Save product to database. Uses create() to allow duplicates across categories."""
-    Product.objects.create(
-        name=data.get("name") or "",
-        url=data.get("url") or "",
-        sku=data.get("sku") or "",
-        description=data.get("description"),
-        mpn=data.get("mpn"),
-        manufacturer=data.get("manufacturer"),
-        color=data.get("color"),
-        memory=data.get("memory"),
-        price=data.get("price"),
-        sale_price=data.get("sale_price"),
-        currency=data.get("currency", "UAH"),
-        images=data.get("images", []),
-        rating=data.get("rating"),
-        review_count=data.get("review_count") or 0,
-        screen_size=data.get("screen_size"),
-        resolution=data.get("resolution"),
-        characteristics=data.get("characteristics", {}),
-        missing_fields=data.get("missing_fields", []),
-        raw_jsonld=data.get("raw_jsonld", {}),
+def run_frontier(
+    frontier: Frontier,
+    claim_size: int,
+    workers: int,
+    timeout: int,
+    use_http: bool = False,
+    lean: bool = False,
+    use_cache: bool = True,
+    refresh_cache: bool = False,
+    snapshot_dir: Optional[str] = None,
+    metrics_log: Optional[str] = None,
+    rate: Optional[float] = None,
+    burst: float = 3.0,
+    on_idle: Optional[Callable[[], None]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Drain the crawl frontier: claim claim_size items at a time and parse them across one process pool.
+
+    Results carry their "frontier_id"; the caller records them (recrawl
+    schedule) and marks them done or failed. Items fetched before are
+    requested with their stored ETag/Last-Modified validators.
+    Leases of the claimed batch are renewed after every result, so they only
+    expire when this process dies. Claimed items not yet parsed when the run
+    is interrupted go back to pending. on_idle works as in run_batch.
+    """
+    pool = multiprocessing.Pool(
+        processes=workers,
+        initializer=_init_batch_worker,
+        initargs=(use_http, lean, use_cache, refresh_cache, snapshot_dir, metrics_log, rate, burst),
+    )
+    in_flight: Dict[str, int] = {}
+    try:
+        while True:
+            claimed = frontier.claim(claim_size)
+            if not claimed:
+                break
+            in_flight = {item.url: item.id for item in claimed}
+            tasks = [(item.url, timeout, item.validators) for item in claimed]
+            for result in _pool_results(pool, tasks, on_idle):
+                result["frontier_id"] = in_flight.pop(result["input"])
+                frontier.renew(in_flight.values())
+                yield result
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        frontier.release(in_flight.values())
+        raise
+    finally:
+        pool.join()
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    """Nearest-rank percentile of values (0.0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize_batch(results: List[Dict[str, Any]], wall_time: float) -> Dict[str, Any]:
+    """Per-worker throughput, failures and latency percentiles for a batch run."""
+    per_worker: Dict[int, Dict[str, Any]] = {}
+    for result in results:
+        stats = per_worker.setdefault(result["worker"], {"items": 0, "failures": 0, "busy_seconds": 0.0})
+        stats["items"] += 1
+        stats["failures"] += 1 if result["error"] else 0
+        stats["busy_seconds"] += result["elapsed"]
+    for stats in per_worker.values():
+        stats["items_per_minute"] = stats["items"] / wall_time * 60.0 if wall_time else 0.0
+    latencies = [result["elapsed"] for result in results]
+    waits: Dict[str, float] = {}
+    for result in results:
+        for step, seconds in result.get("waits", {}).items():
+            waits[step] = waits.get(step, 0.0) + seconds
+    return {
+        "items": len(results),
+        "failures": sum(1 for result in results if result["error"]),
+        "wall_seconds": wall_time,
+        "items_per_minute": len(results) / wall_time * 60.0 if wall_time else 0.0,
+        "latency_p50": _percentile(latencies, 50),
+        "latency_p95": _percentile(latencies, 95),
+        "workers": per_worker,
+        "waits": waits,
+    }
+
+
+def batch_main(args: argparse.Namespace) -> None:
+    items = read_batch_input(Path(args.input)) if args.input else []
+    frontier = None
+    if args.frontier:
+        frontier = Frontier(
+            lease_seconds=args.lease_seconds,
+            max_attempts=args.max_attempts,
+            min_interval=int(args.recrawl_min_hours * 3600),
+            max_interval=int(args.recrawl_max_hours * 3600),
+        )
+        if items:
+            print(f"Added {len(items)} items to the crawl frontier (known ones keep their state).")
+            enqueue(items)
+        print(f"Crawl frontier: {frontier_stats()}")
+    elif not items:
+        print(f"No URLs or queries in {args.input}.")
+        return
+
+    results: List[Dict[str, Any]] = []
+    started = time.perf_counter()
+    # Frontier items are marked done only once their product is in the database
+    unsaved_ids: List[int] = []
+
+    # Without the database the result segments are the only output: one entry per record
+    # written to the sink, the frontier id to complete once its segment is finished
+    segment_ids: List[Optional[int]] = []
+
+    def mark_saved(rows: int) -> None:
+        frontier.complete(unsaved_ids)
+        unsaved_ids.clear()
+
+    def mark_written(entry: Dict[str, Any]) -> None:
+        done = [row_id for row_id in segment_ids[: entry["records"]] if row_id is not None]
+        del segment_ids[: entry["records"]]
+        if not done:
+            return
+        try:
+            frontier.complete(done)
+        except DatabaseError as e:
+            # The leases expire and the items are fetched again later
+            print(f"  failed to complete {len(done)} frontier items of {entry['segment']}: {e}")
+
+    writer = None
+    sink_options: Dict[str, Any] = {}
+    if not args.no_save:
+        writer = BulkProductWriter(batch_size=args.db_batch_size, on_flush=mark_saved if frontier is not None else None)
+    elif frontier is not None:
+        # Finish segments well within the lease, or their items are claimed again before they are completed
+        sink_options = dict(on_segment=mark_written, max_seconds=min(args.rotate_minutes * 60, args.lease_seconds / 2))
+    sink = sink_from_args(args, **sink_options)
+    # Interval flushes and rotations must not wait for the next result, which a slow item can hold up
+    on_idle = writer.tick if writer is not None else sink.tick
+    if frontier is not None:
+        source = run_frontier(
+            frontier, args.claim_size or args.workers * 4, args.workers, args.timeout, on_idle=on_idle, **_worker_options(args)
+        )
+        total = "?"
+    else:
+        source = run_batch(items, args.workers, args.timeout, on_idle=on_idle, **_worker_options(args))
+        total = len(items)
+    with sink:
+        for result in source:
+            results.append(result)
+            metrics.merge(result["metrics"])
+            if args.metrics_textfile:
+                metrics.write_textfile(Path(args.metrics_textfile))
+            status = "FAILED " + result["error"] if result["error"] else "not modified" if result["not_modified"] else "ok"
+            print(f"[{len(results)}/{total}] worker {result['worker']} {result['elapsed']:.1f}s {status}: {result['input']}")
+            if result["not_modified"]:
+                # 304: nothing to parse or save, only the schedule and last_seen move on
+                try:
+                    frontier.record(result["frontier_id"], None, result["validators"])
+                    if writer is not None:
+                        mark_seen([result["url"]])
+                    frontier.complete([result["frontier_id"]])
+                except DatabaseError as e:
+                    # The lease expires and the item is fetched again later
+                    print(f"  failed to record the unchanged fetch: {e}")
+                continue
+            if result["data"] is None:
+                if frontier is not None:
+                    frontier.fail(result["frontier_id"], result["error"])
+                continue
+            durable_id = None
+            if frontier is not None:
+                try:
+                    if frontier.record(result["frontier_id"], content_hash(product_kwargs(result["data"])), result["validators"]):
+                        print(f"  changed since the last crawl: {result['input']}")
+                    if writer is None:
+                        durable_id = result["frontier_id"]
+                    else:
+                        unsaved_ids.append(result["frontier_id"])
+                except DatabaseError as e:
+                    print(f"  failed to record the fetch in the frontier: {e}")
+            with metrics.span("write_file"):
+                sink.write(result["data"])
+            if sink.on_segment is not None:
+                segment_ids.append(durable_id)
+            if writer is not None:
+                writer.add(result["data"])
+    if writer is not None:
+        writer.close()
+    if args.metrics_textfile:
+        # Final write includes the DB saves done by the writer
+        metrics.write_textfile(Path(args.metrics_textfile))
+
+    summary = summarize_batch(results, time.perf_counter() - started)
+    print("\n=== Batch Summary ===")
+    print(
+        f"{summary['items']} items, {summary['failures']} failed, {summary['wall_seconds']:.1f}s, "
+        f"{summary['items_per_minute']:.1f} items/min, p50 {summary['latency_p50']:.1f}s, p95 {summary['latency_p95']:.1f}s"
     )
+    if frontier is not None:
+        print(f"Crawl frontier: {frontier_stats()}")
+    for worker, stats in sorted(summary["workers"].items()):
+        print(
+            f"  worker {worker}: {stats['items']} items, {stats['failures']} failed, "
+            f"{stats['items_per_minute']:.1f} items/min, busy {stats['busy_seconds']:.1f}s"
+        )
+    print("Time spent waiting per step (all items):")
+    for step, seconds in sorted(summary["waits"].items(), key=lambda item: -item[1]):
+        print(f"  {step:<28} {seconds:8.2f}s")
+    print("Stage timings (all items):")
+    print(metrics.format())
 
 
-def write_to_file(data: Dict[str, Any], path: Path) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(data, ensure_ascii=False, indent=4), encoding="utf-8")
+def _worker_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """Batch worker settings shared by run_batch and run_frontier."""
+    return dict(
+        use_http=args.http,
+        lean=args.lean,
+        use_cache=not args.no_cache,
+        refresh_cache=args.refresh_cache,
+        snapshot_dir=args.snapshots,
+        metrics_log=args.metrics_log,
+        rate=args.rate,
+        burst=args.burst,
+    )
 
 
 def main() -> None:
@@ -618,28 +946,89 @@ def main() -> None:
     parser.add_argument("--query", default="Apple iPhone 15 128GB Black", help="Search query if no url provided")
     parser.add_argument("--timeout", type=int, default=25, help="Element wait timeout")
     parser.add_argument("--no-save", action="store_true", help="Do not save to database")
+    parser.add_argument("--input", help="Batch mode: file with one URL or search query per line")
+    parser.add_argument("--workers", type=int, default=2, help="Batch mode: number of parallel browser workers")
+    parser.add_argument("--http", action="store_true", help="Try plain HTTP + JSON-LD first, use the browser only as fallback")
+    parser.add_argument("--lean", action="store_true", help="Headless browser with images, fonts and analytics blocked")
+    parser.add_argument("--db-batch-size", type=int, default=100, help="Batch mode: products per database insert")
+    parser.add_argument("--no-cache", action="store_true", help="Do not use the query -> URL cache")
+    parser.add_argument("--refresh-cache", action="store_true", help="Search again and overwrite cached URLs")
+    parser.add_argument(
+        "--snapshots",
+        nargs="?",
+        const=str(DEFAULT_SNAPSHOT_DIR),
+        help="Store fetched page HTML in a compressed snapshot store (default dir: results/snapshots)",
+    )
+    add_sink_arguments(parser)
+    parser.add_argument("--metrics-log", help="Append per-stage timing spans as JSON lines to this file ('-' for stderr)")
+    parser.add_argument("--metrics-textfile", help="Write stage histograms and counters to this Prometheus textfile")
+    parser.add_argument(
+        "--rate",
+        type=float,
+        help=f"Max requests/sec per host, shared by all workers via {DEFAULT_RATE_LIMIT_PATH.name}; lowered automatically on slow or blocked pages",
+    )
+    parser.add_argument("--burst", type=float, default=3.0, help="Requests allowed back to back before --rate applies")
+    parser.add_argument(
+        "--frontier",
+        action="store_true",
+        help="Batch mode: drain the crawl frontier table (--input adds to it); safe to run on several machines and to restart",
+    )
+    parser.add_argument("--claim-size", type=int, help="Frontier mode: items leased per claim (default: 4 per worker)")
+    parser.add_argument("--lease-seconds", type=int, default=900, help="Frontier mode: lease length before a claim is reclaimed")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Frontier mode: attempts before an item is marked failed")
+    parser.add_argument("--recrawl-min-hours", type=float, default=1, help="Frontier mode: shortest revisit interval (pages that keep changing)")
+    parser.add_argument("--recrawl-max-hours", type=float, default=24 * 14, help="Frontier mode: longest revisit interval (pages that never change)")
     args = parser.parse_args()
+    metrics.configure_log(args.metrics_log)
 
-    target_url = args.url
-    if not target_url:
-        search_result = find_product_url(args.query, timeout=args.timeout)
-        if not search_result:
-            print("Product not found by given query.")
-            return
-        target_url = search_result
+    if args.input or args.frontier:
+        batch_main(args)
+        return
+
+    limiter = RateLimiter(rate=args.rate, burst=args.burst) if args.rate else None
+    # One warm browser serves both the search and the product page
+    with DriverPool(partial(build_driver, lean=args.lean), max_size=1) as pool:
+        target_url = args.url
+        if not target_url:
+            cache = None if args.no_cache else SearchCache()
+            search_result = find_product_url(
+                args.query, timeout=args.timeout, pool=pool, cache=cache, refresh_cache=args.refresh_cache, limiter=limiter
+            )
+            if cache is not None:
+                print(f"Search cache: {cache.stats()}")
+                cache.close()
+            if not search_result:
+                print("Product not found by given query.")
+                return
+            target_url = search_result
 
-    data = parse_product(target_url, timeout=args.timeout)
+        http_client = HttpClient(timeout=args.timeout) if args.http else None
+        snapshots = SnapshotStore(Path(args.snapshots)) if args.snapshots else None
+        data = fetch_product(
+            target_url, timeout=args.timeout, pool=pool, http_client=http_client, snapshots=snapshots, limiter=limiter
+        )
+        if snapshots is not None:
+            snapshots.close()
     
     print("\n=== Parsed Product Data ===")
     pprint(data, width=120, compact=False)
 
-    results_dir = Path(__file__).resolve().parent.parent / "results"
-    write_to_file(data, results_dir / "last_product.json")
+    print("\n=== Wait Report ===")
+    print(wait_report.format())
+
+    with metrics.span("write_file"), sink_from_args(args) as sink:
+        sink.write(data)
+    print(f"\nAppended to {sink.directory} ({args.compress} JSONL segments).")
 
     if not args.no_save:
         save_product(data)
         print("\nData saved to database.")
 
+    print("\n=== Stage Timings ===")
+    print(metrics.format())
+    if args.metrics_textfile:
+        metrics.write_textfile(Path(args.metrics_textfile))
+
 
 if __name__ == "__main__":
     main()
@@ -1,50 +1,210 @@
-"""Load JSON from results directory and save product to database."""
+"""Load JSON results (files, directories, globs, JSONL) and save products to database."""
 from load_django import *  # noqa: F401,F403 - initialize Django
 from parser_app.models import *  # noqa: F401,F403 - access to models
 import argparse
+import glob
+import gzip
+import io
 import json
+import os
+import time
 from pathlib import Path
-from typing import Any, Dict
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
 
+from db_writer import BulkProductWriter
+from result_sink import DEFAULT_RESULTS_DIR, MANIFEST_NAME, read_manifest
 
-def save_from_json(path: Path) -> None:
-    if not path.exists():
-        print(f"File {path} not found.")
-        return
-    data: Dict[str, Any] = json.loads(path.read_text(encoding="utf-8"))
-    Product.objects.create(
-        name=data.get("name") or "",
-        url=data.get("url") or "",
-        sku=data.get("sku") or "",
-        description=data.get("description"),
-        mpn=data.get("mpn"),
-        manufacturer=data.get("manufacturer"),
-        color=data.get("color"),
-        memory=data.get("memory"),
-        price=data.get("price"),
-        sale_price=data.get("sale_price"),
-        currency=data.get("currency", "UAH"),
-        images=data.get("images", []),
-        rating=data.get("rating"),
-        review_count=data.get("review_count") or 0,
-        screen_size=data.get("screen_size"),
-        resolution=data.get("resolution"),
-        characteristics=data.get("characteristics", {}),
-        missing_fields=data.get("missing_fields", []),
-        raw_jsonld=data.get("raw_jsonld", {}),
-    )
-    print("Data from JSON saved to database.")
+try:
+    import zstandard
+except ImportError:  # optional: only needed for .zst inputs
+    zstandard = None
+
+RECORD_SUFFIXES = (".json", ".jsonl", ".ndjson")
+COMPRESSED_SUFFIXES = (".gz", ".zst")
+SKIP_CHUNK = 1024 ** 2
+
+
+def _is_record_file(path: Path) -> bool:
+    name = path.name.lower()
+    for suffix in COMPRESSED_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[: -len(suffix)]
+    return name.endswith(RECORD_SUFFIXES)
+
+
+def is_product(record: Any) -> bool:
+    """Parsed product records carry the (sku, url) identity; listing cards and other JSON don't."""
+    return isinstance(record, dict) and bool(record.get("url")) and bool(record.get("sku"))
+
+
+def discover_inputs(target: str, exclude: Optional[Path] = None) -> List[Path]:
+    """Expand a file, directory (recursively) or glob into a sorted list of result files.
+
+    A directory written by JsonlSink is read through its manifest: only
+    finished segments, in the order they were completed. exclude (the
+    checkpoint file) is never returned.
+    """
+    path = Path(target)
+    if path.is_dir() and (path / MANIFEST_NAME).exists():
+        files = [path / entry["segment"] for entry in read_manifest(path) if (path / entry["segment"]).is_file()]
+    elif path.is_dir():
+        files = sorted(p for p in path.rglob("*") if p.is_file() and _is_record_file(p))
+    elif path.is_file():
+        files = [path]
+    else:
+        files = sorted(Path(p) for p in glob.glob(target, recursive=True) if Path(p).is_file() and _is_record_file(Path(p)))
+    if exclude is not None:
+        files = [file for file in files if file.resolve() != exclude.resolve()]
+    return files
+
+
+def open_binary(path: Path) -> IO[bytes]:
+    """Open a (possibly gzip/zstd compressed) file as a decompressed binary stream."""
+    name = path.name.lower()
+    if name.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if name.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"{path}: install 'zstandard' to read .zst files")
+        # BufferedReader adds readline/iteration on top of the zstd stream
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(path.open("rb"), closefd=True))
+    return path.open("rb")
+
+
+def iter_records(path: Path, offset: int = 0) -> Iterator[Tuple[Dict[str, Any], int]]:
+    """Yield (record, offset after record) from a JSON or JSONL file.
+
+    JSONL is streamed line by line with constant memory; offsets are positions
+    in the decompressed stream, so resuming seeks (or skips) to them. Plain
+    JSON files (one object or a list) are small and read whole; their offset
+    is the number of records already consumed.
+    """
+    name = path.name.lower()
+    for suffix in COMPRESSED_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[: -len(suffix)]
+    with open_binary(path) as stream:
+        if name.endswith(".json"):
+            data = json.load(io.TextIOWrapper(stream, encoding="utf-8"))
+            records = data if isinstance(data, list) else [data]
+            for index in range(offset, len(records)):
+                yield records[index], index + 1
+            return
+
+        if offset and stream.seekable():
+            stream.seek(offset)
+        elif offset:
+            # zstd streams can't seek: read up to the offset
+            remaining = offset
+            while remaining:
+                chunk = stream.read(min(remaining, SKIP_CHUNK))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+        position = offset
+        for line in stream:
+            position += len(line)
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line), position
+            except json.JSONDecodeError as e:
+                print(f"{path}: skipping malformed line ending at byte {position}: {e}")
+
+
+class Checkpoint:
+    """Per-file resume positions, saved atomically after every committed batch."""
+
+    def __init__(self, path: Optional[Path]) -> None:
+        self.path = path
+        self.files: Dict[str, Dict[str, Any]] = {}
+        if path and path.exists():
+            self.files = json.loads(path.read_text(encoding="utf-8")).get("files", {})
+
+    def offset(self, file: Path) -> int:
+        return self.files.get(str(file), {}).get("offset", 0)
+
+    def is_done(self, file: Path) -> bool:
+        return self.files.get(str(file), {}).get("done", False)
+
+    def update(self, file: Path, offset: int, done: bool = False) -> None:
+        self.files[str(file)] = {"offset": offset, "done": done}
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps({"files": self.files}, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def ingest(files: List[Path], batch_size: int, checkpoint: Checkpoint, progress_every: int = 1000) -> int:
+    """Stream product records from files into the database in batched transactions.
+
+    Records that are not products (see is_product) are skipped and counted.
+    """
+    started = time.perf_counter()
+    total = 0
+    skipped = 0
+    # Positions become durable only once the batch holding them is committed
+    pending: Dict[Path, Tuple[int, bool]] = {}
+
+    def on_flush(rows: int) -> None:
+        for file, (offset, done) in pending.items():
+            checkpoint.update(file, offset, done)
+        pending.clear()
+        checkpoint.save()
+
+    with BulkProductWriter(batch_size=batch_size, on_flush=on_flush) as writer:
+        for file in files:
+            if checkpoint.is_done(file):
+                print(f"Skipping {file} (done in checkpoint)")
+                continue
+            offset = checkpoint.offset(file)
+            if offset:
+                print(f"Resuming {file} at offset {offset}")
+            for record, offset in iter_records(file, offset):
+                pending[file] = (offset, False)
+                if not is_product(record):
+                    skipped += 1
+                    continue
+                writer.add(record)
+                total += 1
+                if total % progress_every == 0:
+                    elapsed = time.perf_counter() - started
+                    print(f"{total} records, {writer.written} committed, {total / elapsed:.0f} records/s")
+            pending[file] = (offset, True)
+        # Files without records are marked done even if nothing is left to flush
+        if not writer.flush():
+            on_flush(0)
+
+    elapsed = time.perf_counter() - started
+    print(f"Done: {total} records from {len(files)} files in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} records/s)")
+    if skipped:
+        print(f"Skipped {skipped} records without url/sku (not parsed products)")
+    return total
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Save JSON results to database")
     parser.add_argument(
         "--path",
-        default=str(Path(__file__).resolve().parent.parent / "results" / "last_product.json"),
-        help="Path to JSON results file",
+        default=str(DEFAULT_RESULTS_DIR),
+        help="JSON/JSONL file (optionally .gz/.zst), directory or glob of result files",
     )
+    parser.add_argument("--batch-size", type=int, default=500, help="Records per database transaction")
+    parser.add_argument("--checkpoint", help="Checkpoint file to record progress and resume after a crash")
+    parser.add_argument("--progress-every", type=int, default=1000, help="Print progress every N records")
     args = parser.parse_args()
-    save_from_json(Path(args.path))
+
+    files = discover_inputs(args.path, exclude=Path(args.checkpoint) if args.checkpoint else None)
+    if not files:
+        print(f"No result files found for {args.path}.")
+        return
+    checkpoint = Checkpoint(Path(args.checkpoint) if args.checkpoint else None)
+    ingest(files, args.batch_size, checkpoint, args.progress_every)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,336 @@
+"""Buffered, batched upserts of parsed product dicts into the Product table.
+
+Every upsert also appends a PriceObservation for products whose price,
+sale price or currency differs from their latest observation, and stores
+the characteristics and JSON-LD payloads in JsonBlob, once per distinct
+content: products only carry the blob hashes.
+"""
+from load_django import *  # noqa: F401,F403 - initialize Django
+import atexit
+import hashlib
+import io
+import json
+import time
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from django.db import connection, transaction
+from django.utils import timezone
+from psycopg2.extras import execute_values
+
+from metrics import metrics
+from parser_app.models import JsonBlob, PriceObservation, Product
+
+# Payloads stored in JsonBlob: product_kwargs key -> Product attname of the blob reference
+BLOB_FIELDS = {"characteristics": "characteristics_blob_id", "raw_jsonld": "raw_jsonld_blob_id"}
+# Hashes this process saw committed; blobs are never deleted, so these are skipped on later inserts
+_KNOWN_BLOBS_MAX = 100_000
+_known_blobs: Set[str] = set()
+
+
+def product_kwargs(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a parsed product dict to Product field values (BLOB_FIELDS payloads still inline)."""
+    return dict(
+        name=data.get("name") or "",
+        url=data.get("url") or "",
+        sku=data.get("sku") or "",
+        description=data.get("description"),
+        mpn=data.get("mpn"),
+        manufacturer=data.get("manufacturer"),
+        color=data.get("color"),
+        memory=data.get("memory"),
+        price=data.get("price"),
+        sale_price=data.get("sale_price"),
+        currency=data.get("currency", "UAH"),
+        images=data.get("images", []),
+        rating=data.get("rating"),
+        review_count=data.get("review_count") or 0,
+        screen_size=data.get("screen_size"),
+        resolution=data.get("resolution"),
+        characteristics=data.get("characteristics", {}),
+        missing_fields=data.get("missing_fields", []),
+        raw_jsonld=data.get("raw_jsonld", {}),
+    )
+
+
+def content_hash(kwargs: Dict[str, Any]) -> str:
+    """sha256 of the normalised Product field values (numbers rounded to cents, keys sorted)."""
+    normalised = dict(kwargs)
+    for name in ("price", "sale_price", "rating"):
+        if normalised.get(name) is not None:
+            normalised[name] = f"{Decimal(str(normalised[name])):.2f}"
+    payload = json.dumps(normalised, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def canonical_blob(data: Any) -> Tuple[str, str]:
+    """(sha256, canonical JSON) of a payload: sorted keys and compact separators, so equal data hashes equally."""
+    encoded = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest(), encoded
+
+
+def _identity(kwargs: Dict[str, Any]) -> Tuple[str, str]:
+    return kwargs["sku"], kwargs["url"]
+
+
+class BulkProductWriter:
+    """Collects parsed product dicts and upserts them in batches.
+
+    A batch is flushed when it reaches batch_size, when flush_interval seconds
+    passed since the last flush (checked on add() and tick()), and on close()
+    or interpreter exit. Each flush is one transaction; on PostgreSQL batches of
+    at least copy_threshold rows are staged with COPY instead of INSERT VALUES.
+    See upsert_products for the upsert rules.
+
+    Args:
+        batch_size: Rows buffered before a flush.
+        flush_interval: Max seconds rows may wait in the buffer.
+        copy_threshold: Minimum batch size that uses COPY (None disables COPY).
+        on_flush: Called with the number of rows after each successful flush.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        flush_interval: float = 30.0,
+        copy_threshold: Optional[int] = 1000,
+        on_flush: Optional[Callable[[int], None]] = None,
+    ) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.copy_threshold = copy_threshold
+        self.on_flush = on_flush
+        self.written = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._last_flush = time.monotonic()
+        atexit.register(self.close)
+
+    def __enter__(self) -> "BulkProductWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def add(self, data: Dict[str, Any]) -> int:
+        """Buffer one product; returns the number of rows flushed (0 if none)."""
+        self._buffer.append(data)
+        if len(self._buffer) >= self.batch_size:
+            return self.flush()
+        return self.tick()
+
+    def tick(self) -> int:
+        """Flush if the buffer is older than flush_interval."""
+        if self._buffer and time.monotonic() - self._last_flush >= self.flush_interval:
+            return self.flush()
+        return 0
+
+    def flush(self) -> int:
+        batch, self._buffer = self._buffer, []
+        self._last_flush = time.monotonic()
+        if not batch:
+            return 0
+        use_copy = self.copy_threshold is not None and len(batch) >= self.copy_threshold
+        upsert_products(batch, use_copy=use_copy)
+        self.written += len(batch)
+        if self.on_flush:
+            self.on_flush(len(batch))
+        return len(batch)
+
+    def close(self) -> None:
+        atexit.unregister(self.close)
+        self.flush()
+
+
+def upsert_products(batch: List[Dict[str, Any]], use_copy: bool = False) -> None:
+    """Insert or update products keyed on (sku, url) in one transaction.
+
+    Each row carries a content hash of its normalised values. Rows whose hash
+    matches the stored one only get last_seen bumped; the other columns (and
+    updated_at) are rewritten only when the content actually changed. On
+    PostgreSQL this is one INSERT ... ON CONFLICT statement per batch, plus
+    one INSERT ... SELECT appending the changed prices. Payload blobs not yet
+    known to this process are inserted first with ON CONFLICT DO NOTHING, so
+    a blob shared by many products (or recrawls) is written once.
+    """
+    now = timezone.now()
+    rows: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    blobs: Dict[str, str] = {}
+    for data in batch:
+        kwargs = product_kwargs(data)
+        # Hashed with the payloads inline, so stored hashes stay comparable
+        kwargs["content_hash"] = content_hash(kwargs)
+        for name, attname in BLOB_FIELDS.items():
+            kwargs[attname] = _blob_ref(kwargs.pop(name), blobs)
+        # ON CONFLICT can't touch one row twice per statement: last one wins
+        rows[_identity(kwargs)] = {**kwargs, "last_seen": now, "created_at": now, "updated_at": now}
+    with metrics.span("db_save", rows=len(rows)), transaction.atomic():
+        if connection.vendor != "postgresql":
+            _insert_blobs_orm(blobs)
+            ids = _upsert_orm(list(rows.values()))
+            _append_prices_orm(ids, now)
+        else:
+            _insert_blobs(blobs, now)
+            ids = _upsert_copy(list(rows.values())) if use_copy else _upsert_values(list(rows.values()))
+            _append_prices(ids, now)
+        transaction.on_commit(lambda: _remember_blobs(blobs))
+
+
+def mark_seen(urls: List[str]) -> int:
+    """Bump last_seen of products confirmed unchanged without a parse (HTTP 304)."""
+    return Product.objects.filter(url__in=urls).update(last_seen=timezone.now())
+
+
+def _blob_ref(data: Any, blobs: Dict[str, str]) -> Optional[str]:
+    """Hash referencing data (None for an empty payload); new blobs are collected in blobs."""
+    if not data:
+        return None
+    digest, encoded = canonical_blob(data)
+    if digest not in _known_blobs:
+        blobs[digest] = encoded
+    return digest
+
+
+def _remember_blobs(blobs: Dict[str, str]) -> None:
+    if len(_known_blobs) + len(blobs) > _KNOWN_BLOBS_MAX:
+        _known_blobs.clear()
+    _known_blobs.update(blobs)
+
+
+def _insert_blobs(blobs: Dict[str, str], now: datetime) -> None:
+    """INSERT ... ON CONFLICT DO NOTHING, in hash order so concurrent writers can't deadlock on shared blobs."""
+    if not blobs:
+        return
+    table = connection.ops.quote_name(JsonBlob._meta.db_table)
+    values = [(digest, blobs[digest], len(blobs[digest].encode("utf-8")), now) for digest in sorted(blobs)]
+    with connection.cursor() as cursor:
+        execute_values(
+            cursor.cursor,
+            f"INSERT INTO {table} (hash, data, size, created_at) VALUES %s ON CONFLICT (hash) DO NOTHING",
+            values,
+            template="(%s, %s::jsonb, %s, %s)",
+            page_size=len(values),
+        )
+
+
+def _insert_blobs_orm(blobs: Dict[str, str]) -> None:
+    JsonBlob.objects.bulk_create(
+        [
+            JsonBlob(hash=digest, data=json.loads(encoded), size=len(encoded.encode("utf-8")))
+            for digest, encoded in sorted(blobs.items())
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def _fields() -> List[Any]:
+    return [field for field in Product._meta.concrete_fields if not field.primary_key]
+
+
+def _on_conflict_sql(table: str) -> str:
+    """ON CONFLICT clause: always bump last_seen, rewrite the rest only if the hash changed."""
+    quote = connection.ops.quote_name
+    keep = {"sku", "url", "created_at", "last_seen"}
+    changed = f"{table}.{quote('content_hash')} IS DISTINCT FROM EXCLUDED.{quote('content_hash')}"
+    assignments = [
+        f"{quote(field.column)} = CASE WHEN {changed} THEN EXCLUDED.{quote(field.column)} ELSE {table}.{quote(field.column)} END"
+        for field in _fields()
+        if field.name not in keep
+    ]
+    assignments.append(f"{quote('last_seen')} = EXCLUDED.{quote('last_seen')}")
+    return f"ON CONFLICT ({quote('sku')}, {quote('url')}) DO UPDATE SET " + ", ".join(assignments)
+
+
+def _upsert_values(rows: List[Dict[str, Any]]) -> List[int]:
+    fields = _fields()
+    table = connection.ops.quote_name(Product._meta.db_table)
+    columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+    values = [[field.get_db_prep_save(row[field.attname], connection) for field in fields] for row in rows]
+    with connection.cursor() as cursor:
+        returned = execute_values(
+            cursor.cursor,
+            f"INSERT INTO {table} ({columns}) VALUES %s {_on_conflict_sql(table)} RETURNING id",
+            values,
+            page_size=len(values),
+            fetch=True,
+        )
+    return [row[0] for row in returned]
+
+
+def _upsert_copy(rows: List[Dict[str, Any]]) -> List[int]:
+    """COPY rows into a temporary staging table, then upsert from it."""
+    fields = _fields()
+    table = connection.ops.quote_name(Product._meta.db_table)
+    columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_value(row[field.attname]) for field in fields) + "\n")
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE TEMP TABLE product_stage ON COMMIT DROP AS SELECT {columns} FROM {table} WITH NO DATA")
+        cursor.copy_expert(f"COPY product_stage ({columns}) FROM STDIN", buffer)
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}) SELECT {columns} FROM product_stage {_on_conflict_sql(table)} RETURNING id"
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _upsert_orm(rows: List[Dict[str, Any]]) -> List[int]:
+    """Row-by-row ORM upsert used when the connection is not PostgreSQL.
+
+    Not a supported backend: the migrations need PostgreSQL (concurrent, GIN
+    and BRIN indexes), so this only serves tables created without them.
+    """
+    ids = []
+    for row in rows:
+        values = {name: value for name, value in row.items() if name not in ("created_at", "updated_at")}
+        unchanged = Product.objects.filter(sku=row["sku"], url=row["url"], content_hash=row["content_hash"])
+        if not unchanged.update(last_seen=row["last_seen"]):
+            Product.objects.update_or_create(sku=row["sku"], url=row["url"], defaults=values)
+        ids.append(Product.objects.only("id").get(sku=row["sku"], url=row["url"]).id)
+    return ids
+
+
+def _append_prices(ids: List[int], now: datetime) -> None:
+    """Append an observation for each product whose price differs from its latest one."""
+    if not ids:
+        return
+    products = connection.ops.quote_name(Product._meta.db_table)
+    prices = connection.ops.quote_name(PriceObservation._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {prices} (product_id, observed_at, price, sale_price, currency)
+            SELECT p.id, %s, p.price, p.sale_price, p.currency
+            FROM {products} p
+            LEFT JOIN LATERAL (
+                SELECT o.price, o.sale_price, o.currency FROM {prices} o
+                WHERE o.product_id = p.id ORDER BY o.observed_at DESC LIMIT 1
+            ) last ON TRUE
+            WHERE p.id = ANY(%s)
+              AND (p.price IS NOT NULL OR p.sale_price IS NOT NULL)
+              AND (last.currency IS NULL
+                   OR last.price IS DISTINCT FROM p.price
+                   OR last.sale_price IS DISTINCT FROM p.sale_price
+                   OR last.currency <> p.currency)
+            """,
+            [now, ids],
+        )
+
+
+def _append_prices_orm(ids: List[int], now: datetime) -> None:
+    for product in Product.objects.filter(id__in=ids).exclude(price=None, sale_price=None):
+        last = product.prices.order_by("-observed_at").first()
+        if last is None or (last.price, last.sale_price, last.currency) != (product.price, product.sale_price, product.currency):
+            PriceObservation.objects.create(
+                product=product, observed_at=now, price=product.price, sale_price=product.sale_price, currency=product.currency
+            )
+
+
+def _copy_value(value: Any) -> str:
+    """Encode a value for COPY ... FROM STDIN in text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, ensure_ascii=False)
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
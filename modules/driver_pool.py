@@ -0,0 +1,169 @@
+"""Pool of warm Chrome instances shared by search and product parsing."""
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, List, Optional
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+
+
+@dataclass
+class _PooledDriver:
+    driver: webdriver.Chrome
+    uses: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class DriverPool:
+    """Hands out warm, health-checked webdriver.Chrome instances.
+
+    Starting Chrome + chromedriver is the largest fixed cost per product, so
+    drivers are returned to the pool after use instead of being quit.
+
+    Args:
+        factory: Callable that starts a new driver (e.g. build_driver).
+        max_size: Maximum number of live browsers; borrowers wait when all are busy.
+        idle_timeout: Seconds an unused browser may stay in the pool before it is quit.
+        recycle_after: Quit a browser after it has served this many pages (borrows),
+            which keeps Chrome memory growth in check on long runs.
+        acquire_timeout: Seconds to wait for a free browser (None waits forever).
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], webdriver.Chrome],
+        max_size: int = 1,
+        idle_timeout: float = 300.0,
+        recycle_after: int = 50,
+        acquire_timeout: Optional[float] = None,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self._factory = factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.recycle_after = recycle_after
+        self.acquire_timeout = acquire_timeout
+        self._idle: List[_PooledDriver] = []
+        self._live = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def __enter__(self) -> "DriverPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @contextmanager
+    def driver(self) -> Iterator[webdriver.Chrome]:
+        """Borrow a driver for the duration of the with-block."""
+        entry = self._acquire()
+        try:
+            yield entry.driver
+        finally:
+            self._release(entry)
+
+    def close(self) -> None:
+        """Quit all idle drivers; drivers still borrowed are quit on release."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._live -= len(idle)
+            self._cond.notify_all()
+        for entry in idle:
+            _quit(entry.driver)
+
+    def _acquire(self) -> _PooledDriver:
+        deadline = None if self.acquire_timeout is None else time.monotonic() + self.acquire_timeout
+        entry: Optional[_PooledDriver] = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("DriverPool is closed")
+                expired = self._evict_idle_locked()
+                if expired:
+                    self._cond.release()
+                    try:
+                        for stale in expired:
+                            _quit(stale.driver)
+                    finally:
+                        self._cond.acquire()
+                    continue
+                if self._idle:
+                    # LIFO: the most recently used browser has the warmest caches
+                    entry = self._idle.pop()
+                    break
+                if self._live < self.max_size:
+                    self._live += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("No free browser in DriverPool")
+                self._cond.wait(remaining)
+
+        if entry is not None and not _is_healthy(entry.driver):
+            _quit(entry.driver)
+            entry = None
+        if entry is None:
+            try:
+                entry = _PooledDriver(self._factory())
+            except Exception:
+                with self._cond:
+                    self._live -= 1
+                    self._cond.notify()
+                raise
+        entry.uses += 1
+        return entry
+
+    def _release(self, entry: _PooledDriver) -> None:
+        with self._cond:
+            keep = not self._closed and entry.uses < self.recycle_after
+            if keep:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+            else:
+                self._live -= 1
+            self._cond.notify()
+        if not keep:
+            _quit(entry.driver)
+
+    def _evict_idle_locked(self) -> List[_PooledDriver]:
+        now = time.monotonic()
+        expired = [entry for entry in self._idle if now - entry.last_used > self.idle_timeout]
+        if expired:
+            self._idle = [entry for entry in self._idle if entry not in expired]
+            self._live -= len(expired)
+        return expired
+
+
+@contextmanager
+def borrow_driver(pool: Optional[DriverPool], factory: Callable[[], webdriver.Chrome]) -> Iterator[webdriver.Chrome]:
+    """Borrow a driver from pool, or start a one-off driver if no pool is given."""
+    if pool is not None:
+        with pool.driver() as driver:
+            yield driver
+        return
+    driver = factory()
+    try:
+        yield driver
+    finally:
+        driver.quit()
+
+
+def _is_healthy(driver: webdriver.Chrome) -> bool:
+    """Cheap round trip to check the browser session is still alive."""
+    try:
+        driver.execute_script("return 1;")
+        return True
+    except WebDriverException:
+        return False
+
+
+def _quit(driver: webdriver.Chrome) -> None:
+    try:
+        driver.quit()
+    except WebDriverException:
+        pass
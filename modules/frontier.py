@@ -0,0 +1,212 @@
+"""Resumable crawl frontier stored in PostgreSQL next to Product.
+
+Every URL (or search query) to crawl is a CrawlFrontier row. Processes on
+any number of machines claim batches with SELECT ... FOR UPDATE SKIP LOCKED,
+so concurrent claimers never block on or double-claim each other's rows.
+A claim is a lease: it expires after lease_seconds unless renewed, and
+expired leases are claimed again by whoever asks next, so the work of a
+crashed process is picked up without any cleanup step. Items that keep
+failing are given up on after max_attempts.
+
+Done items are recrawled: record() compares each fetch with the previous
+one and sets next_due. A page whose content changed gets its revisit
+interval halved, an unchanged one gets it doubled (within min/max), so
+volatile prices are checked often and stable pages back off exponentially.
+Stored ETag/Last-Modified validators let the HTTP path ask for 304s.
+"""
+from load_django import *  # noqa: F401,F403 - initialize Django
+import os
+import random
+import socket
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Value, When
+from django.utils import timezone
+
+from parser_app.models import CrawlFrontier
+
+State = CrawlFrontier.State
+HOUR = 3600
+
+
+@dataclass
+class FrontierItem:
+    id: int
+    url: str
+    # If-None-Match / If-Modified-Since headers from the previous fetch
+    validators: Dict[str, str] = field(default_factory=dict)
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue(items: Iterable[str], batch_size: int = 1000) -> int:
+    """Add items as pending rows; items already in the frontier keep their state.
+
+    Returns the number of items submitted (duplicates included).
+    """
+    submitted = 0
+    batch: List[CrawlFrontier] = []
+    for item in items:
+        batch.append(CrawlFrontier(url=item))
+        if len(batch) >= batch_size:
+            CrawlFrontier.objects.bulk_create(batch, ignore_conflicts=True)
+            submitted += len(batch)
+            batch = []
+    if batch:
+        CrawlFrontier.objects.bulk_create(batch, ignore_conflicts=True)
+        submitted += len(batch)
+    return submitted
+
+
+class Frontier:
+    """Lease-based access to the crawl frontier for one worker process.
+
+    Args:
+        worker: Lease owner name (default "host:pid").
+        lease_seconds: How long a claim stays valid without renew().
+        max_attempts: Leases an item gets before it is marked failed.
+        first_interval: Seconds until the first recrawl of a newly fetched item.
+        min_interval: Shortest recrawl interval in seconds.
+        max_interval: Longest recrawl interval in seconds.
+    """
+
+    def __init__(
+        self,
+        worker: Optional[str] = None,
+        lease_seconds: int = 900,
+        max_attempts: int = 3,
+        first_interval: int = 24 * HOUR,
+        min_interval: int = HOUR,
+        max_interval: int = 14 * 24 * HOUR,
+    ) -> None:
+        self.worker = worker or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.first_interval = first_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+    def claim(self, size: int) -> List[FrontierItem]:
+        """Lease up to size items: new ones first, then expired leases and due recrawls, most overdue first."""
+        now = timezone.now()
+        with transaction.atomic():
+            rows = list(
+                CrawlFrontier.objects.select_for_update(skip_locked=True)
+                .filter(
+                    Q(state=State.PENDING)
+                    | Q(state=State.IN_PROGRESS, lease_expires__lt=now)
+                    | Q(state=State.DONE, next_due__lte=now)
+                )
+                .order_by(F("next_due").asc(nulls_first=True), "id")
+                .values_list("id", "url", "attempts", "state", "etag", "last_modified")[:size]
+            )
+            # Recrawls start a fresh round of attempts
+            rows = [
+                (row_id, url, 0 if state == State.DONE else attempts, etag, modified)
+                for row_id, url, attempts, state, etag, modified in rows
+            ]
+            # Expired leases that already used every attempt: the item keeps killing its worker
+            exhausted = [row_id for row_id, _, attempts, _, _ in rows if attempts >= self.max_attempts]
+            if exhausted:
+                CrawlFrontier.objects.filter(id__in=exhausted).update(
+                    state=State.FAILED,
+                    last_error="Lease expired on the last attempt",
+                    leased_by="",
+                    lease_expires=None,
+                    updated_at=now,
+                )
+            claimed = [
+                FrontierItem(id=row_id, url=url, validators=_validators(etag, modified))
+                for row_id, url, attempts, etag, modified in rows
+                if attempts < self.max_attempts
+            ]
+            claimed_ids = [item.id for item in claimed]
+            CrawlFrontier.objects.filter(id__in=claimed_ids, state=State.DONE).update(attempts=0)
+            CrawlFrontier.objects.filter(id__in=claimed_ids).update(
+                state=State.IN_PROGRESS,
+                attempts=F("attempts") + 1,
+                leased_by=self.worker,
+                lease_expires=now + timedelta(seconds=self.lease_seconds),
+                updated_at=now,
+            )
+        return claimed
+
+    def renew(self, ids: Iterable[int]) -> int:
+        """Extend this worker's leases on ids; returns how many were still held."""
+        now = timezone.now()
+        return self._leased(ids).update(lease_expires=now + timedelta(seconds=self.lease_seconds), updated_at=now)
+
+    def record(self, row_id: int, content_hash: Optional[str], validators: Optional[Dict[str, str]] = None) -> bool:
+        """Store a successful fetch and schedule the next one; returns whether the content changed.
+
+        content_hash is None when the server answered 304 Not Modified.
+        validators are the request headers to send next time (see FrontierItem).
+        """
+        now = timezone.now()
+        row = CrawlFrontier.objects.get(id=row_id)
+        first = not row.content_hash
+        changed = content_hash is not None and not first and content_hash != row.content_hash
+        interval = row.recrawl_seconds or self.first_interval
+        if changed:
+            interval //= 2
+        elif not first:
+            interval *= 2
+        interval = min(self.max_interval, max(self.min_interval, interval))
+        # Jitter keeps items fetched together from coming due together forever
+        next_due = now + timedelta(seconds=interval * random.uniform(0.9, 1.1))
+        updates = dict(next_due=next_due, recrawl_seconds=interval, checks=F("checks") + 1, updated_at=now)
+        if content_hash is not None:
+            updates["content_hash"] = content_hash
+        if changed:
+            updates.update(changes=F("changes") + 1, last_changed=now)
+        if validators is not None:
+            updates.update(etag=validators.get("If-None-Match", ""), last_modified=validators.get("If-Modified-Since", ""))
+        CrawlFrontier.objects.filter(id=row_id).update(**updates)
+        return changed
+
+    def complete(self, ids: Iterable[int]) -> None:
+        """Mark items done, even if their lease expired meanwhile: the work is finished either way."""
+        CrawlFrontier.objects.filter(id__in=list(ids)).exclude(state=State.DONE).update(
+            state=State.DONE, last_error="", leased_by="", lease_expires=None, updated_at=timezone.now()
+        )
+
+    def fail(self, row_id: int, error: str) -> None:
+        """Record a failed attempt: back to pending, or failed once max_attempts is used up."""
+        self._leased([row_id]).update(
+            state=Case(When(attempts__gte=self.max_attempts, then=Value(State.FAILED)), default=Value(State.PENDING)),
+            last_error=error,
+            leased_by="",
+            lease_expires=None,
+            updated_at=timezone.now(),
+        )
+
+    def release(self, ids: Iterable[int]) -> None:
+        """Return leased but unstarted items to pending without using up an attempt."""
+        self._leased(ids).update(
+            state=State.PENDING, attempts=F("attempts") - 1, leased_by="", lease_expires=None, updated_at=timezone.now()
+        )
+
+    def _leased(self, ids: Iterable[int]):
+        return CrawlFrontier.objects.filter(id__in=list(ids), state=State.IN_PROGRESS, leased_by=self.worker)
+
+
+def _validators(etag: str, last_modified: str) -> Dict[str, str]:
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+def frontier_stats() -> Dict[str, int]:
+    """Row count per state."""
+    counts = {state.value: 0 for state in State}
+    for row in CrawlFrontier.objects.order_by().values("state").annotate(rows=Count("id")):
+        counts[row["state"]] = row["rows"]
+    return counts
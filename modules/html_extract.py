@@ -0,0 +1,140 @@
+"""Extract product data from server-rendered or saved HTML without a browser (lxml)."""
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import lxml.html
+from lxml.cssselect import CSSSelector
+
+from product_fields import build_product_data, load_jsonld
+from snapshot_store import read_object
+
+# Same selectors as the Selenium path in 2_parse_product.py, compiled once
+JSONLD_CSS = CSSSelector('script[type="application/ld+json"]')
+REVIEWS_CSS = CSSSelector(".comments-average-rating-stars + .br-pp-r span")
+REVIEWS_ALT_CSS = CSSSelector("span.forbid-click.reviews-count span")
+CHAR_CONTAINER_IDS = ("br-pr-7", "br-characteristics")
+KEY_SPAN_CSS = CSSSelector("span:nth-child(1)")
+KEY_SPAN_ALT_CSS = CSSSelector("span:first-of-type")
+VALUE_SPAN_CSS = CSSSelector("span:nth-child(2)")
+VALUE_SPAN_ALT_CSS = CSSSelector("span:nth-of-type(2)")
+DIV_CSS = CSSSelector("div")
+LINK_CSS = CSSSelector("a")
+IMG_CSS = CSSSelector("img")
+PAGE_URL_CSS = CSSSelector('link[rel="canonical"], meta[property="og:url"]')
+
+
+def _text(element: Optional[lxml.html.HtmlElement]) -> str:
+    return element.text_content().strip() if element is not None else ""
+
+
+def _first(selector: CSSSelector, element: lxml.html.HtmlElement) -> Optional[lxml.html.HtmlElement]:
+    found = selector(element)
+    return found[0] if found else None
+
+
+def parse_html(html: str) -> lxml.html.HtmlElement:
+    return lxml.html.fromstring(html)
+
+
+def extract_jsonld(doc: lxml.html.HtmlElement) -> Dict[str, Any]:
+    return load_jsonld([script.text or "" for script in JSONLD_CSS(doc)]) or {}
+
+
+def extract_characteristics_html(doc: lxml.html.HtmlElement) -> Dict[str, str]:
+    """Parse characteristics from #br-pr-7 / #br-characteristics.
+
+    Mirrors extract_characteristics in 2_parse_product.py: rows are divs with a
+    span:nth-child(1) descendant, values fall back to link texts and then to
+    "key: value" splitting of the row text, whitespace is normalised.
+    """
+    characteristics: Dict[str, str] = {}
+    container = None
+    for container_id in CHAR_CONTAINER_IDS:
+        found = doc.get_element_by_id(container_id, None)
+        if found is not None:
+            container = found
+            break
+    if container is None:
+        return characteristics
+
+    divs = DIV_CSS(container)
+    rows = [div for div in divs if KEY_SPAN_CSS(div)] or divs
+    for row in rows:
+        row_text = row.text_content().strip()
+        if not row_text:
+            continue
+
+        key_el = _first(KEY_SPAN_CSS, row)
+        if key_el is None:
+            key_el = _first(KEY_SPAN_ALT_CSS, row)
+        val_el = _first(VALUE_SPAN_CSS, row)
+        if val_el is None:
+            val_el = _first(VALUE_SPAN_ALT_CSS, row)
+
+        key = _text(key_el)
+        value = _text(val_el)
+
+        # If value is empty, try to get from links
+        if not value:
+            link_texts = [_text(link) for link in LINK_CSS(row)]
+            value = ", ".join([t for t in link_texts if t])
+
+        # If still no value, but we have key, try to extract from row text
+        if key and not value and ":" in row_text:
+            parts = row_text.split(":", 1)
+            if parts[0].strip() == key:
+                value = parts[1].strip()
+
+        key = " ".join(key.split())
+        value = " ".join(value.split())
+        if key:
+            characteristics[key] = value
+    return characteristics
+
+
+def extract_review_count(doc: lxml.html.HtmlElement) -> Optional[int]:
+    review_el = _first(REVIEWS_CSS, doc)
+    if review_el is None:
+        review_el = _first(REVIEWS_ALT_CSS, doc)
+    review_text = _text(review_el)
+    return int(review_text) if review_text.isdigit() else None
+
+
+def extract_images(doc: lxml.html.HtmlElement, jsonld: Dict[str, Any]) -> List[str]:
+    images = jsonld.get("image") if isinstance(jsonld.get("image"), list) else []
+    if not images:
+        images = [img.get("src") for img in IMG_CSS(doc) if img.get("src")]
+    return images
+
+
+def extract_page_url(doc: lxml.html.HtmlElement) -> Optional[str]:
+    """Canonical page URL recorded in a saved page, if any."""
+    for element in PAGE_URL_CSS(doc):
+        url = element.get("href") or element.get("content")
+        if url:
+            return url
+    return None
+
+
+def extract_from_html(html: str, url: Optional[str] = None) -> Dict[str, Any]:
+    """Build the same data dict as parse_product from a page's HTML.
+
+    url defaults to the page's canonical URL (empty string if it has none).
+    """
+    doc = parse_html(html)
+    if url is None:
+        url = extract_page_url(doc) or ""
+    jsonld = extract_jsonld(doc)
+    characteristics = extract_characteristics_html(doc)
+    return build_product_data(
+        jsonld,
+        characteristics,
+        url,
+        review_count=extract_review_count(doc),
+        images=extract_images(doc, jsonld),
+    )
+
+
+def extract_from_file(path: Path, url: Optional[str] = None) -> Dict[str, Any]:
+    """extract_from_html for a saved page (.html, optionally .gz/.zst compressed)."""
+    return extract_from_html(read_object(Path(path)), url)
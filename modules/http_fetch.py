@@ -0,0 +1,142 @@
+"""Plain HTTP fetching with pooled keep-alive connections (no browser)."""
+import gzip
+import http.client
+import threading
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+)
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+# Errors after which a reused keep-alive connection is dropped and the request retried once
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionResetError, BrokenPipeError)
+
+
+class NotModified(Exception):
+    """The server answered 304 to a conditional request: the stored copy is current."""
+
+
+@dataclass
+class HttpResponse:
+    url: str
+    status: int
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+
+    @property
+    def text(self) -> str:
+        content_type = self.headers.get("content-type", "")
+        charset = "utf-8"
+        if "charset=" in content_type:
+            charset = content_type.split("charset=", 1)[1].split(";", 1)[0].strip() or charset
+        try:
+            return self.body.decode(charset, errors="replace")
+        except LookupError:  # Unknown charset name in the header
+            return self.body.decode("utf-8", errors="replace")
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers that revalidate this response later."""
+        headers = {}
+        if self.headers.get("etag"):
+            headers["If-None-Match"] = self.headers["etag"]
+        if self.headers.get("last-modified"):
+            headers["If-Modified-Since"] = self.headers["last-modified"]
+        return headers
+
+
+class HttpClient:
+    """Reuses one keep-alive connection per (scheme, host) and thread.
+
+    Args:
+        timeout: Socket timeout in seconds.
+        user_agent: User-Agent header sent with every request.
+        max_redirects: Redirects followed before giving up.
+    """
+
+    def __init__(self, timeout: float = 15.0, user_agent: str = DEFAULT_USER_AGENT, max_redirects: int = 5) -> None:
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.max_redirects = max_redirects
+        self._local = threading.local()
+
+    def __enter__(self) -> "HttpClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> HttpResponse:
+        """GET url following redirects; the body is decompressed."""
+        for _ in range(self.max_redirects + 1):
+            response = self._request(url, headers or {})
+            location = response.headers.get("location")
+            if response.status not in REDIRECT_STATUSES or not location:
+                return response
+            url = urljoin(url, location)
+        raise http.client.HTTPException(f"Too many redirects for {url}")
+
+    def close(self) -> None:
+        """Close connections opened by the calling thread."""
+        for connection in self._connections().values():
+            connection.close()
+        self._connections().clear()
+
+    def _connections(self) -> Dict[Tuple[str, str], http.client.HTTPConnection]:
+        if not hasattr(self._local, "connections"):
+            self._local.connections = {}
+        return self._local.connections
+
+    def _connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        connections = self._connections()
+        key = (scheme, netloc)
+        if key not in connections:
+            connection_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            connections[key] = connection_class(netloc, timeout=self.timeout)
+        return connections[key]
+
+    def _request(self, url: str, headers: Dict[str, str]) -> HttpResponse:
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        request_headers = {
+            "User-Agent": self.user_agent,
+            "Accept": "text/html,application/xhtml+xml,*/*;q=0.8",
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+            **headers,
+        }
+        for attempt in range(2):
+            connection = self._connection(parts.scheme, parts.netloc)
+            try:
+                connection.request("GET", path, headers=request_headers)
+                raw = connection.getresponse()
+                body = raw.read()
+                break
+            except STALE_CONNECTION_ERRORS:
+                connection.close()
+                self._connections().pop((parts.scheme, parts.netloc), None)
+                if attempt:
+                    raise
+        response_headers = {name.lower(): value for name, value in raw.getheaders()}
+        if raw.will_close:
+            connection.close()
+            self._connections().pop((parts.scheme, parts.netloc), None)
+        return HttpResponse(url=url, status=raw.status, headers=response_headers, body=_decode_body(body, response_headers))
+
+
+def _decode_body(body: bytes, headers: Dict[str, str]) -> bytes:
+    encoding = headers.get("content-encoding", "").lower()
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "deflate":
+        try:
+            return zlib.decompress(body)
+        except zlib.error:
+            # Some servers send raw deflate without the zlib header
+            return zlib.decompress(body, -zlib.MAX_WBITS)
+    return body
@@ -0,0 +1,228 @@
+"""Timing spans, JSON log lines and a Prometheus textfile for the scrape pipeline.
+
+Every span (driver start, page load, JSON-LD, expanding and extracting
+characteristics, field derivation, file write, DB save, ...) is observed in a
+per-stage histogram and, when a log is configured, written as one JSON line.
+Counters track missing product fields and wait timeouts per selector step.
+write_textfile() exports everything in the Prometheus text format for the
+node_exporter textfile collector.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+# Histogram upper bounds in seconds (+Inf is implicit)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+COUNTER_HELP = {
+    "scrape_missing_fields_total": "Products parsed without the given field.",
+    "scrape_wait_timeouts_total": "Condition waits that timed out, per wait step (selector).",
+    "scrape_stage_errors_total": "Spans that ended with an exception, per stage.",
+    "scrape_products_total": "Products parsed, per parse path.",
+    "scrape_blocked_total": "Challenge or block pages, per host.",
+    "scrape_slow_pages_total": "Page loads slower than the rate limiter's threshold, per host.",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(labels: LabelKey) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')) for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Metrics:
+    """Thread-safe span histograms and counters.
+
+    Batch workers send snapshot() back with each result and the parent
+    merge()s them, so one textfile covers all processes.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[str, Any]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._log: Optional[IO[str]] = None
+
+    def configure_log(self, path: Optional[str]) -> None:
+        """Write JSON span lines to path ("-" for stderr, None to disable)."""
+        with self._lock:
+            if self._log is not None and self._log is not sys.stderr:
+                self._log.close()
+            if not path:
+                self._log = None
+            elif path == "-":
+                self._log = sys.stderr
+            else:
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+                # Append mode + one write per line keeps lines from several workers intact
+                self._log = open(path, "a", encoding="utf-8", buffering=1)
+
+    @contextmanager
+    def span(self, stage: str, **fields: Any) -> Iterator[Dict[str, Any]]:
+        """Time the block under stage; extra fields go to the JSON log line.
+
+        The yielded dict can be updated inside the block to add fields.
+        """
+        started = time.perf_counter()
+        extra: Dict[str, Any] = dict(fields)
+        status, error = "ok", None
+        try:
+            yield extra
+        except BaseException as e:
+            status, error = "error", f"{type(e).__name__}: {e}"
+            self.count("scrape_stage_errors_total", stage=stage)
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            self.observe(stage, seconds)
+            self.log_event("span", **{**extra, "stage": stage, "seconds": round(seconds, 6), "status": status, "error": error})
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._histograms.setdefault(
+                stage, {"buckets": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            )
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram["buckets"][index] += 1
+                    break
+            else:
+                histogram["buckets"][-1] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+    def count(self, name: str, amount: float = 1, **labels: Any) -> None:
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _labels(labels)
+            series[key] = series.get(key, 0) + amount
+
+    def count_missing_fields(self, missing_fields: List[str]) -> None:
+        for field in missing_fields:
+            self.count("scrape_missing_fields_total", field=field)
+
+    def log_event(self, event: str, **fields: Any) -> None:
+        if self._log is None:
+            return
+        record = {"ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"), "pid": os.getpid(), "event": event}
+        record.update((key, value) for key, value in fields.items() if value is not None)
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if self._log is not None:
+                self._log.write(line)
+
+    def quantile(self, stage: str, q: float) -> Optional[float]:
+        """Estimate a quantile from the histogram (linear within a bucket, like histogram_quantile)."""
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if not histogram or not histogram["count"]:
+                return None
+            buckets = list(histogram["buckets"])
+            total = histogram["count"]
+        rank = q * total
+        cumulative = 0
+        lower = 0.0
+        for index, bound in enumerate(self.buckets):
+            if cumulative + buckets[index] >= rank:
+                inside = buckets[index]
+                return lower + (bound - lower) * ((rank - cumulative) / inside if inside else 0.0)
+            cumulative += buckets[index]
+            lower = bound
+        # Above the largest finite bucket
+        return self.buckets[-1]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Picklable copy of all histograms and counters."""
+        with self._lock:
+            return {
+                "histograms": {
+                    stage: {"buckets": list(h["buckets"]), "sum": h["sum"], "count": h["count"]}
+                    for stage, h in self._histograms.items()
+                },
+                "counters": {
+                    name: [[list(map(list, key)), value] for key, value in series.items()]
+                    for name, series in self._counters.items()
+                },
+            }
+
+    def merge(self, snapshot: Dict[str, Any]) -> None:
+        with self._lock:
+            for stage, other in snapshot["histograms"].items():
+                histogram = self._histograms.setdefault(
+                    stage, {"buckets": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+                )
+                histogram["buckets"] = [a + b for a, b in zip(histogram["buckets"], other["buckets"])]
+                histogram["sum"] += other["sum"]
+                histogram["count"] += other["count"]
+            for name, entries in snapshot["counters"].items():
+                series = self._counters.setdefault(name, {})
+                for key, value in entries:
+                    key = tuple(tuple(pair) for pair in key)
+                    series[key] = series.get(key, 0) + value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def write_textfile(self, path: Path) -> None:
+        """Atomically write all metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP scrape_stage_seconds Time spent per pipeline stage.",
+            "# TYPE scrape_stage_seconds histogram",
+        ]
+        with self._lock:
+            for stage, histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, hits in zip(list(self.buckets) + [float("inf")], histogram["buckets"]):
+                    cumulative += hits
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"scrape_stage_seconds_bucket{_format_labels((('le', le), ('stage', stage)))} {cumulative}")
+                lines.append(f"scrape_stage_seconds_sum{_format_labels((('stage', stage),))} {histogram['sum']}")
+                lines.append(f"scrape_stage_seconds_count{_format_labels((('stage', stage),))} {histogram['count']}")
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# HELP {name} {COUNTER_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(key)} {value:g}")
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(tmp, path)
+
+    def format(self) -> str:
+        """Per-stage count, mean and p50/p95 estimates for console output."""
+        with self._lock:
+            stages = {stage: (h["count"], h["sum"]) for stage, h in self._histograms.items()}
+            counters = {name: dict(series) for name, series in self._counters.items()}
+        lines = []
+        for stage, (count, total) in stages.items():
+            p50, p95 = self.quantile(stage, 0.5), self.quantile(stage, 0.95)
+            lines.append(
+                f"  {stage:<24} n={count:<5} mean {total / count:6.2f}s  p50 ~{p50:6.2f}s  p95 ~{p95:6.2f}s"
+            )
+        for name, series in counters.items():
+            for key, value in series.items():
+                lines.append(f"  {name}{_format_labels(key)} {value:g}")
+        return "\n".join(lines)
+
+
+# Process-wide metrics; scripts export them, batch workers reset them per item
+metrics = Metrics()
@@ -0,0 +1,297 @@
+"""Run listing discovery, product parsing and DB saving as one overlapping pipeline.
+
+    source (crawl / input file / listings JSONL)
+        -> bounded URL queue -> N parse workers (one warm browser each)
+        -> bounded result queue -> batched DB writer (+ JSONL results file)
+
+Bounded queues give backpressure: a slow stage blocks the stage feeding it,
+so memory stays flat however large the crawl is. SIGTERM or Ctrl+C stops
+discovery and drains what is already queued or in flight; a second signal
+drops the queued items and only finishes the ones being parsed.
+
+    python modules/pipeline.py --crawl "https://brain.com.ua/ukr/category/..." --workers 4 --lean
+    python modules/pipeline.py --input urls.txt --workers 4 --http
+"""
+from load_django import *  # noqa: F401,F403 - initialize Django
+import argparse
+import contextlib
+import importlib
+import json
+import queue
+import signal
+import threading
+import time
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from django.db import connection
+
+from browser import build_driver
+from db_writer import BulkProductWriter
+from driver_pool import DriverPool
+from http_fetch import HttpClient
+from metrics import metrics
+from rate_limit import RateLimiter
+from result_sink import JsonlSink, add_sink_arguments, sink_from_args
+from search_cache import SearchCache
+from waits import wait_report
+
+listings = importlib.import_module("1_get_listings")
+parser_module = importlib.import_module("2_parse_product")
+
+# Marks the end of a queue's stream
+_DONE = object()
+
+
+class Pipeline:
+    """Threads and queues connecting discovery, parsing and saving.
+
+    Args:
+        workers: Parse worker threads (and browsers).
+        queue_size: Capacity of each bounded queue.
+        timeout: Element wait timeout for search and parsing.
+        lean: Use the lean browser profile.
+        use_http: Try plain HTTP before the browser when parsing.
+        use_cache: Resolve search queries through the query -> URL cache.
+        save: Write products to the database.
+        db_batch_size: Products per database transaction.
+        sink: Rotating JSONL sink receiving every parsed product (None to skip).
+        rate: Max requests/sec per host for crawl, search and product pages (None: unlimited).
+        burst: Requests allowed back to back before rate applies.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        queue_size: int = 100,
+        timeout: int = 25,
+        lean: bool = False,
+        use_http: bool = False,
+        use_cache: bool = True,
+        save: bool = True,
+        db_batch_size: int = 100,
+        sink: Optional[JsonlSink] = None,
+        rate: Optional[float] = None,
+        burst: float = 3.0,
+    ) -> None:
+        self.workers = workers
+        self.timeout = timeout
+        self.save = save
+        self.db_batch_size = db_batch_size
+        self.sink = sink
+        self.urls: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self.results: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        # Set on the first signal: stop discovery. Set on the second: drop queued items too
+        self.stopping = threading.Event()
+        self.aborting = threading.Event()
+        self.parse_pool = DriverPool(partial(build_driver, lean=lean), max_size=workers)
+        self.crawl_pool = DriverPool(partial(build_driver, lean=lean), max_size=1)
+        self.http_client = HttpClient(timeout=timeout) if use_http else None
+        self.cache = SearchCache() if use_cache else None
+        self.limiter = RateLimiter(rate=rate, burst=burst) if rate else None
+        self.counts = {"discovered": 0, "parsed": 0, "failed": 0, "saved": 0, "dropped": 0}
+        self._counts_lock = threading.Lock()
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._counts_lock:
+            self.counts[name] += amount
+
+    def request_stop(self, signum: int, frame: Any) -> None:
+        if self.stopping.is_set():
+            print("\nSecond signal: dropping queued items, finishing the ones in progress.")
+            self.aborting.set()
+        else:
+            print("\nStopping discovery, draining queued and in-flight items (signal again to drop the queue).")
+            self.stopping.set()
+
+    def _put(self, target: "queue.Queue[Any]", item: Any) -> bool:
+        """Blocking put that gives up once the pipeline is aborting."""
+        while not self.aborting.is_set():
+            try:
+                target.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce(self, source: Iterator[str]) -> None:
+        try:
+            for item in source:
+                if self.stopping.is_set() or not self._put(self.urls, item):
+                    break
+                self._count("discovered")
+        except Exception as e:
+            print(f"Discovery failed: {type(e).__name__}: {e}")
+        finally:
+            if hasattr(source, "close"):
+                # Releases the crawl browser of an unfinished generator
+                source.close()
+            for _ in range(self.workers):
+                self.urls.put(_DONE)
+
+    def parse_worker(self) -> None:
+        while True:
+            item = self.urls.get()
+            if item is _DONE:
+                return
+            if self.aborting.is_set():
+                self._count("dropped")
+                continue
+            started = time.perf_counter()
+            try:
+                url = item
+                if not item.startswith(("http://", "https://")):
+                    url = parser_module.find_product_url(
+                        item, timeout=self.timeout, pool=self.parse_pool, cache=self.cache, limiter=self.limiter
+                    )
+                    if not url:
+                        raise LookupError("Product not found by given query")
+                data = parser_module.fetch_product(
+                    url, timeout=self.timeout, pool=self.parse_pool, http_client=self.http_client, limiter=self.limiter
+                )
+            except Exception as e:
+                self._count("failed")
+                print(f"FAILED {item}: {type(e).__name__}: {e}")
+                continue
+            self._count("parsed")
+            print(f"parsed in {time.perf_counter() - started:.1f}s: {data['url']}")
+            # In-flight results are kept even when aborting
+            self.results.put(data)
+
+    def write(self) -> None:
+        try:
+            self._write_results()
+        except Exception as e:
+            print(f"Writer failed, stopping pipeline: {type(e).__name__}: {e}")
+            self.stopping.set()
+            self.aborting.set()
+            # Keep consuming so parse workers never block on a full queue
+            while self.results.get() is not _DONE:
+                self._count("dropped")
+        finally:
+            # The writer thread owns its own database connection
+            connection.close()
+
+    def _write_results(self) -> None:
+        with contextlib.ExitStack() as stack:
+            writer = None
+            if self.save:
+                writer = stack.enter_context(
+                    BulkProductWriter(batch_size=self.db_batch_size, on_flush=partial(self._count, "saved"))
+                )
+            if self.sink is not None:
+                stack.enter_context(self.sink)
+            while True:
+                try:
+                    data = self.results.get(timeout=1.0)
+                except queue.Empty:
+                    if writer is not None:
+                        writer.tick()
+                    continue
+                if data is _DONE:
+                    return
+                if self.sink is not None:
+                    self.sink.write(data)
+                if writer is not None:
+                    writer.add(data)
+
+    def run(self, source: Iterator[str]) -> Dict[str, int]:
+        started = time.perf_counter()
+        producer = threading.Thread(target=self.produce, args=(source,), name="pipeline-source")
+        parsers = [threading.Thread(target=self.parse_worker, name=f"pipeline-parse-{i}") for i in range(self.workers)]
+        writer = threading.Thread(target=self.write, name="pipeline-writer")
+        for thread in [producer, writer, *parsers]:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in parsers):
+                next(thread for thread in parsers if thread.is_alive()).join(timeout=5.0)
+                print(
+                    f"queues: urls {self.urls.qsize()}, results {self.results.qsize()} | "
+                    + ", ".join(f"{name} {value}" for name, value in self.counts.items())
+                )
+            producer.join()
+        finally:
+            self.results.put(_DONE)
+            writer.join()
+            self.parse_pool.close()
+            self.crawl_pool.close()
+            if self.http_client is not None:
+                self.http_client.close()
+            if self.cache is not None:
+                self.cache.close()
+            if self.limiter is not None:
+                self.limiter.close()
+        self.counts["seconds"] = round(time.perf_counter() - started, 1)
+        return self.counts
+
+
+def read_listings_file(path: Path) -> Iterator[str]:
+    """URLs from a 1_get_listings.py --crawl JSONL file."""
+    with path.open(encoding="utf-8") as stream:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)["url"]
+
+
+def crawl_urls(pipeline: Pipeline, start_url: str, max_pages: Optional[int]) -> Iterator[str]:
+    for item in listings.crawl_listings(
+        start_url, timeout=pipeline.timeout, pool=pipeline.crawl_pool, max_pages=max_pages, limiter=pipeline.limiter
+    ):
+        yield item.url
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Crawl, parse and save products as one pipeline")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--crawl", help="Category or search URL to crawl for product URLs")
+    source.add_argument("--input", help="File with one URL or search query per line")
+    source.add_argument("--listings", help="JSONL file written by 1_get_listings.py --crawl")
+    parser.add_argument("--max-pages", type=int, help="Crawl mode: stop after this many listing pages")
+    parser.add_argument("--workers", type=int, default=2, help="Parse workers (one browser each)")
+    parser.add_argument("--queue-size", type=int, default=100, help="Capacity of each bounded queue")
+    parser.add_argument("--timeout", type=int, default=25, help="Element wait timeout")
+    parser.add_argument("--lean", action="store_true", help="Headless browser with images, fonts and analytics blocked")
+    parser.add_argument("--http", action="store_true", help="Try plain HTTP + JSON-LD first, use the browser only as fallback")
+    parser.add_argument("--no-cache", action="store_true", help="Do not use the query -> URL cache")
+    parser.add_argument("--no-save", action="store_true", help="Do not save to database")
+    parser.add_argument("--db-batch-size", type=int, default=100, help="Products per database transaction")
+    add_sink_arguments(parser)
+    parser.add_argument("--rate", type=float, help="Max requests/sec per host, lowered automatically on slow or blocked pages")
+    parser.add_argument("--burst", type=float, default=3.0, help="Requests allowed back to back before --rate applies")
+    args = parser.parse_args()
+
+    pipeline = Pipeline(
+        workers=args.workers,
+        queue_size=args.queue_size,
+        timeout=args.timeout,
+        lean=args.lean,
+        use_http=args.http,
+        use_cache=not args.no_cache,
+        save=not args.no_save,
+        db_batch_size=args.db_batch_size,
+        sink=sink_from_args(args),
+        rate=args.rate,
+        burst=args.burst,
+    )
+    signal.signal(signal.SIGINT, pipeline.request_stop)
+    signal.signal(signal.SIGTERM, pipeline.request_stop)
+
+    if args.crawl:
+        items = crawl_urls(pipeline, args.crawl, args.max_pages)
+    elif args.listings:
+        items = read_listings_file(Path(args.listings))
+    else:
+        items = iter(parser_module.read_batch_input(Path(args.input)))
+    counts = pipeline.run(items)
+
+    print("\n=== Pipeline Summary ===")
+    print(", ".join(f"{name} {value}" for name, value in counts.items()))
+    print("\n=== Wait Report ===")
+    print(wait_report.format())
+    print("\n=== Stage Timings ===")
+    print(metrics.format())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Query the price history recorded in PriceObservation.
+
+An observation holds a product's price from its observed_at until the next
+observation, so "price at T" is the newest observation at or before T
+(served by price_product_time_idx). Whole-catalogue time ranges use the BRIN
+index on observed_at.
+
+    python modules/price_history.py SKU                       # full series
+    python modules/price_history.py SKU --at 2026-10-01T12:00  # price at that time
+"""
+from load_django import *  # noqa: F401,F403 - initialize Django
+import argparse
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+from django.utils import timezone
+
+from parser_app.models import PriceObservation
+
+
+def _for_sku(sku: str, url: Optional[str] = None):
+    observations = PriceObservation.objects.filter(product__sku=sku)
+    if url is not None:
+        observations = observations.filter(product__url=url)
+    return observations
+
+
+def price_at(sku: str, at: datetime, url: Optional[str] = None) -> Optional[PriceObservation]:
+    """Observation in effect at time at (None if the product had no price yet).
+
+    A SKU listed under several URLs has one series per URL; pass url to pick one,
+    otherwise the most recent observation across them is returned.
+    """
+    return _for_sku(sku, url).filter(observed_at__lte=at).order_by("-observed_at").first()
+
+
+def price_series(
+    sku: str, start: Optional[datetime] = None, end: Optional[datetime] = None, url: Optional[str] = None
+) -> List[PriceObservation]:
+    """Observations of sku in time order, including the one already in effect at start."""
+    observations = _for_sku(sku, url).select_related("product").order_by("observed_at")
+    if end is not None:
+        observations = observations.filter(observed_at__lte=end)
+    if start is None:
+        return list(observations)
+    series = list(observations.filter(observed_at__gt=start))
+    opening = price_at(sku, start, url)
+    return [opening, *series] if opening is not None else series
+
+
+def observations_between(start: datetime, end: datetime, chunk_size: int = 2000) -> Iterator[PriceObservation]:
+    """All price changes in [start, end) across the catalogue, in time order."""
+    observations = PriceObservation.objects.filter(observed_at__gte=start, observed_at__lt=end).order_by("observed_at")
+    yield from observations.iterator(chunk_size=chunk_size)
+
+
+def _parse_time(value: str) -> datetime:
+    moment = datetime.fromisoformat(value)
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Show the price history of a SKU")
+    parser.add_argument("sku", help="Product SKU")
+    parser.add_argument("--url", help="Only the listing under this URL")
+    parser.add_argument("--at", type=_parse_time, help="Print the price in effect at this ISO time")
+    parser.add_argument("--since", type=_parse_time, help="Series start (ISO time)")
+    parser.add_argument("--until", type=_parse_time, help="Series end (ISO time)")
+    args = parser.parse_args()
+
+    if args.at:
+        observation = price_at(args.sku, args.at, args.url)
+        if observation is None:
+            print(f"No price recorded for {args.sku} at {args.at.isoformat()}.")
+            return
+        print(f"{observation.price} {observation.currency} (sale {observation.sale_price}) since {observation.observed_at.isoformat()}")
+        return
+
+    series = price_series(args.sku, args.since, args.until, args.url)
+    if not series:
+        print(f"No price history for {args.sku}.")
+    for observation in series:
+        print(f"{observation.observed_at.isoformat()}  {observation.price} {observation.currency}  sale {observation.sale_price}  {observation.product.url}")
+
+
+if __name__ == "__main__":
+    main()
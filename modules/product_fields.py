@@ -0,0 +1,230 @@
+"""Build the product data dict from JSON-LD and characteristics.
+
+Shared by the Selenium and the HTML (no browser) extraction paths, so it must
+not depend on webdriver or Django.
+"""
+import json
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class FieldRule:
+    """How one product field is found among the characteristics.
+
+    Args:
+        aliases: Substrings matched case-insensitively against characteristic
+            keys; the first matching key (in page order) gives the value.
+        fallback_key: Exact key tried when the matched value is empty.
+        rescan: Substrings for a last pass that takes the first matching key
+            with a non-empty value when the field is still empty.
+    """
+
+    aliases: Tuple[str, ...]
+    fallback_key: Optional[str] = None
+    rescan: Tuple[str, ...] = ()
+
+
+# Declarative alias table; Ukrainian/Russian keys are data from the website, not code
+FIELD_RULES: Dict[str, FieldRule] = {
+    "color": FieldRule(aliases=("Колір", "колір", "цвет", "Color"), fallback_key="Колір"),
+    "memory": FieldRule(
+        aliases=("Об'єм пам'яті", "пам", "память", "Memory", "Вбудована пам'ять"),
+        fallback_key="Вбудована пам'ять",
+    ),
+    "screen_size": FieldRule(
+        aliases=("Діагональ екрану", "Діагональ", "діагональ", "Диагональ", "Screen", "Display"),
+        fallback_key="Діагональ екрану",
+        rescan=("діагональ", "диагональ"),
+    ),
+    "resolution": FieldRule(
+        aliases=("Роздільна здатність дисплея", "Роздільна здатність екрану", "роздільна", "Разрешение", "Resolution"),
+        fallback_key="Роздільна здатність екрану",
+        rescan=("розділь", "разреш"),
+    ),
+}
+
+
+def _compile_rules(rules: Dict[str, FieldRule]) -> Tuple[Tuple[str, Tuple[str, ...], Tuple[str, ...]], ...]:
+    """Lower-case and deduplicate the aliases once: (field, aliases, rescan) per rule."""
+    return tuple(
+        (
+            field,
+            tuple(dict.fromkeys(alias.lower() for alias in rule.aliases)),
+            tuple(dict.fromkeys(alias.lower() for alias in rule.rescan)),
+        )
+        for field, rule in rules.items()
+    )
+
+
+_COMPILED_RULES = _compile_rules(FIELD_RULES)
+
+
+@lru_cache(maxsize=8192)
+def key_fields(key: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """Fields whose aliases, and fields whose rescan substrings, match key.
+
+    Spec tables repeat the same few hundred keys across products, so the
+    lower-casing and substring tests run once per distinct key per process.
+    """
+    key_lower = key.lower()
+    matched = tuple(field for field, aliases, _ in _COMPILED_RULES if any(alias in key_lower for alias in aliases))
+    rescanned = tuple(field for field, _, rescan in _COMPILED_RULES if any(alias in key_lower for alias in rescan))
+    return matched, rescanned
+
+
+def resolve_fields(characteristics: Dict[str, str]) -> Dict[str, Optional[str]]:
+    """Derive every FIELD_RULES field from characteristics in one pass over the keys."""
+    derived: Dict[str, Optional[str]] = {}
+    rescanned: Dict[str, str] = {}
+    for key, value in characteristics.items():
+        matched, rescan = key_fields(key)
+        for field in matched:
+            if field not in derived:
+                derived[field] = value if value else None
+        for field in rescan:
+            if not rescanned.get(field):
+                rescanned[field] = value
+    fields: Dict[str, Optional[str]] = {}
+    for field, rule in FIELD_RULES.items():
+        value = derived.get(field)
+        if not value and rule.fallback_key is not None:
+            value = characteristics.get(rule.fallback_key)
+        if not value and field in rescanned:
+            value = rescanned[field]
+        fields[field] = value
+    return fields
+
+
+def load_jsonld(blocks: List[str]) -> Optional[Dict[str, Any]]:
+    for block in blocks:
+        try:
+            data = json.loads(block)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(data, list):
+            for item in data:
+                if isinstance(item, dict) and item.get("@type") == "Product":
+                    return item
+        if isinstance(data, dict) and data.get("@type") == "Product":
+            return data
+    return None
+
+
+def build_product_data(
+    jsonld: Dict[str, Any],
+    characteristics: Dict[str, str],
+    url: str,
+    review_count: Optional[int] = None,
+    images: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Combine JSON-LD and characteristics into the product data dict with English keys.
+
+    Args:
+        jsonld: Product JSON-LD object (empty dict if the page had none).
+        characteristics: Characteristics {key: value} from the page.
+        url: Final product page URL.
+        review_count: Review count read from the page, if any.
+        images: Image URLs; defaults to the JSON-LD "image" list.
+
+    Returns:
+        Dict[str, Any]: Product data including "missing_fields".
+    """
+    missing_fields: List[str] = []
+
+    def mark_missing(field_name: str, is_missing: bool) -> None:
+        if is_missing and field_name not in missing_fields:
+            missing_fields.append(field_name)
+
+    if images is None:
+        images = jsonld.get("image") if isinstance(jsonld.get("image"), list) else []
+
+    # Extract basic fields from JSON-LD with None defaults
+    name = jsonld.get("name") if jsonld else None
+    description = jsonld.get("description") if jsonld else None
+    sku = jsonld.get("sku") if jsonld else None
+    mpn = jsonld.get("mpn") if jsonld else None
+
+    brand_name = None
+    try:
+        brand = jsonld.get("brand")
+        if isinstance(brand, dict):
+            brand_name = brand.get("name")
+    except (AttributeError, KeyError) as e:
+        print(f"Failed to extract brand: {e}")
+        brand_name = None
+
+    # Extract price and currency
+    price = None
+    currency = "UAH"
+    try:
+        offers = jsonld.get("offers") or {}
+        if isinstance(offers, dict):
+            price = offers.get("price")
+            currency = offers.get("priceCurrency", "UAH")
+    except (AttributeError, KeyError) as e:
+        print(f"Failed to extract price: {e}")
+
+    # Derive fields from characteristics (None if not found) in one pass
+    derived = resolve_fields(characteristics)
+    color = derived["color"]
+    memory = derived["memory"]
+    screen_size = derived["screen_size"]
+    resolution = derived["resolution"]
+
+    # Override brand if found in characteristics
+    # Note: Ukrainian keys (like "Виробник", "Модель") are data from the website, not code
+    if not brand_name and characteristics:
+        brand_name = characteristics.get("Виробник")
+
+    # Override name with model from characteristics if available
+    if characteristics.get("Модель"):
+        name = characteristics.get("Модель")
+
+    # Simple heuristics if field not found in characteristics
+    if not memory and name:
+        match = re.search(r"(\d+\s?GB)", name, re.IGNORECASE)
+        if match:
+            memory = match.group(1)
+
+    if not color and name:
+        for candidate in ["Black", "White", "Blue", "Pink", "Green", "Red", "Yellow", "Purple"]:
+            if candidate.lower() in name.lower():
+                color = candidate
+                break
+
+    # Build data dictionary with English keys
+    data = {
+        "name": name,
+        "url": url,
+        "description": description,
+        "sku": sku,
+        "mpn": mpn,
+        "manufacturer": brand_name,
+        "color": color,
+        "memory": memory,
+        "price": float(price) if price else None,
+        "sale_price": None,
+        "currency": currency or "UAH",
+        "images": images,
+        "rating": None,
+        "review_count": review_count,
+        "screen_size": screen_size,
+        "resolution": resolution,
+        "characteristics": characteristics,
+        "raw_jsonld": jsonld or {},
+    }
+
+    # Mark missing fields including characteristics presence
+    mark_missing("name", not data.get("name"))
+    mark_missing("sku", not data.get("sku"))
+    mark_missing("manufacturer", not data.get("manufacturer"))
+    mark_missing("color", not data.get("color"))
+    mark_missing("memory", not data.get("memory"))
+    mark_missing("screen_size", not data.get("screen_size"))
+    mark_missing("resolution", not data.get("resolution"))
+    mark_missing("characteristics", not data.get("characteristics"))
+    data["missing_fields"] = missing_fields
+    return data
@@ -0,0 +1,122 @@
+"""Re-run product extraction over saved HTML pages without a browser.
+
+Useful after a selector or field-heuristic fix: every saved page (a folder of
+.html files, optionally .gz/.zst compressed, and/or the latest page of every
+URL in a snapshot store) is parsed again with lxml across all CPU cores and
+written as JSONL that 3_save_results.py can ingest.
+
+    python modules/reextract.py --pages saved_pages/ --output results/reextracted.jsonl
+    python modules/reextract.py --snapshots results/snapshots --workers 8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from html_extract import extract_from_file
+from snapshot_store import SnapshotStore
+
+PAGE_SUFFIXES = (".html", ".htm")
+COMPRESSED_SUFFIXES = (".gz", ".zst")
+
+
+def _is_page_file(path: Path) -> bool:
+    name = path.name.lower()
+    for suffix in COMPRESSED_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[: -len(suffix)]
+    return name.endswith(PAGE_SUFFIXES)
+
+
+def discover_pages(folder: Path) -> List[Tuple[Path, Optional[str]]]:
+    """(path, url) of every saved page under folder; url comes from the page itself."""
+    return [(path, None) for path in sorted(folder.rglob("*")) if path.is_file() and _is_page_file(path)]
+
+
+def snapshot_pages(root: Path) -> List[Tuple[Path, Optional[str]]]:
+    """(path, url) of the newest stored page of every URL in a snapshot store."""
+    with SnapshotStore(root) as store:
+        return [(path, url) for url, path in store.latest_pages()]
+
+
+def _extract_task(task: Tuple[Path, Optional[str]]) -> Dict[str, Any]:
+    path, url = task
+    started = time.perf_counter()
+    try:
+        data, error = extract_from_file(path, url), None
+        if not data["name"] and not data["sku"]:
+            data, error = None, "no product data (JSON-LD/characteristics) in page"
+    except Exception as e:
+        data, error = None, f"{type(e).__name__}: {e}"
+    return {"path": str(path), "data": data, "error": error, "elapsed": time.perf_counter() - started}
+
+
+def reextract(
+    tasks: List[Tuple[Path, Optional[str]]],
+    workers: int,
+    chunksize: int = 32,
+) -> Iterator[Dict[str, Any]]:
+    """Extract pages across a process pool, yielding results as they finish.
+
+    Pages are cheap to parse, so they are sent to workers in chunks to keep
+    inter-process overhead small.
+    """
+    with multiprocessing.Pool(processes=workers) as pool:
+        yield from pool.imap_unordered(_extract_task, tasks, chunksize=chunksize)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-extract product data from saved HTML pages")
+    parser.add_argument("--pages", help="Folder of saved pages (.html/.htm, optionally .gz/.zst)")
+    parser.add_argument("--snapshots", help="Snapshot store directory: re-extract the latest page of every URL")
+    parser.add_argument(
+        "--output",
+        default=str(Path(__file__).resolve().parent.parent / "results" / "reextracted.jsonl"),
+        help="JSONL file for extracted products",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Parallel extraction processes")
+    parser.add_argument("--chunksize", type=int, default=32, help="Pages handed to a worker at a time")
+    parser.add_argument("--progress-every", type=int, default=1000, help="Print progress every N pages")
+    args = parser.parse_args()
+
+    if not args.pages and not args.snapshots:
+        parser.error("give --pages and/or --snapshots")
+    tasks: List[Tuple[Path, Optional[str]]] = []
+    if args.pages:
+        tasks.extend(discover_pages(Path(args.pages)))
+    if args.snapshots:
+        tasks.extend(snapshot_pages(Path(args.snapshots)))
+    if not tasks:
+        print("No saved pages found.")
+        return
+
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    done = failures = incomplete = 0
+    with output_path.open("w", encoding="utf-8") as output:
+        for result in reextract(tasks, args.workers, args.chunksize):
+            done += 1
+            if result["error"]:
+                failures += 1
+                print(f"FAILED {result['path']}: {result['error']}")
+            else:
+                if result["data"]["missing_fields"]:
+                    incomplete += 1
+                output.write(json.dumps(result["data"], ensure_ascii=False) + "\n")
+            if done % args.progress_every == 0:
+                elapsed = time.perf_counter() - started
+                print(f"{done}/{len(tasks)} pages, {done / elapsed:.0f} pages/s")
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"Done: {done} pages, {failures} failed, {incomplete} with missing fields, "
+        f"{elapsed:.1f}s ({done / elapsed if elapsed else 0:.0f} pages/s) -> {output_path}"
+    )
+
+
+if __name__ == "__main__":
+    main()
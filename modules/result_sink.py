@@ -0,0 +1,245 @@
+"""Append-only, rotating, optionally compressed JSONL sink for parsed products.
+
+Every process writes its own segment files, named after host, pid and start
+time, so several workers or machines can share one directory without
+interleaving lines. A segment is written as <name>.part and renamed when it
+is rotated (by size or age) or closed, so readers such as 3_save_results.py
+only ever see complete segments; a .part file left behind is the output of a
+crashed writer. Each finished segment appends one JSON line to
+segments.manifest (under an exclusive lock) with its record count, sizes and
+time range; on_segment is then called with that entry, so a caller can
+treat the records as durable only from that point.
+
+    sink = JsonlSink(DEFAULT_RESULTS_DIR, compression="gzip")
+    sink.write(data)
+    sink.close()
+"""
+import argparse
+import atexit
+import gzip
+import json
+import os
+import socket
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, List, Optional
+
+try:
+    import zstandard
+except ImportError:  # optional: only needed for compression="zstd"
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows: manifest lines rely on O_APPEND alone
+    fcntl = None
+
+DEFAULT_RESULTS_DIR = Path(__file__).resolve().parent.parent / "results" / "products"
+MANIFEST_NAME = "segments.manifest"
+COMPRESSIONS = ("none", "gzip", "zstd")
+# "never": leave it to the OS, "segment": fsync each finished segment, "flush": fsync every buffer flush
+FSYNC_POLICIES = ("never", "segment", "flush")
+SUFFIXES = {"none": ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+
+
+class JsonlSink:
+    """Buffered JSONL writer with size/time rotation and a segment manifest.
+
+    Args:
+        directory: Output directory for segments and the manifest.
+        prefix: Segment file name prefix.
+        compression: "none", "gzip" or "zstd".
+        max_bytes: Rotate once a segment's file reaches this size.
+        max_seconds: Rotate segments older than this (None: size only).
+        fsync: Durability policy, one of FSYNC_POLICIES.
+        buffer_records: Records buffered in memory before they are written.
+        flush_interval: Max seconds records may wait in the buffer.
+        on_segment: Called with the manifest entry of each finished segment.
+    """
+
+    def __init__(
+        self,
+        directory: Path = DEFAULT_RESULTS_DIR,
+        prefix: str = "products",
+        compression: str = "gzip",
+        max_bytes: int = 64 * 1024 ** 2,
+        max_seconds: Optional[float] = 3600.0,
+        fsync: str = "segment",
+        buffer_records: int = 100,
+        flush_interval: float = 5.0,
+        on_segment: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> None:
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"compression must be one of {COMPRESSIONS}")
+        if compression == "zstd" and zstandard is None:
+            raise RuntimeError("install 'zstandard' to write .zst segments")
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}")
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self.compression = compression
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.fsync = fsync
+        self.buffer_records = buffer_records
+        self.flush_interval = flush_interval
+        self.on_segment = on_segment
+        self.records = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._buffer: List[bytes] = []
+        self._last_flush = time.monotonic()
+        self._sequence = 0
+        self._segment: Optional[Dict[str, Any]] = None
+        atexit.register(self.close)
+
+    def __enter__(self) -> "JsonlSink":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = (json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str) + "\n").encode("utf-8")
+        with self._lock:
+            self._buffer.append(line)
+            self.records += 1
+            if len(self._buffer) >= self.buffer_records or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def tick(self) -> None:
+        """Flush an overdue buffer and finish a segment past max_seconds, without waiting for the next write."""
+        with self._lock:
+            if self._buffer and time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+            if self._segment is not None and self._should_rotate(self._segment):
+                self._finish_segment()
+
+    def close(self) -> None:
+        atexit.unregister(self.close)
+        with self._lock:
+            self._flush()
+            self._finish_segment()
+
+    def _flush(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        segment = self._segment
+        if segment is not None and self._should_rotate(segment):
+            self._finish_segment()
+            segment = None
+        if segment is None:
+            segment = self._open_segment()
+        batch, self._buffer = self._buffer, []
+        segment["stream"].write(b"".join(batch))
+        segment["records"] += len(batch)
+        segment["raw_bytes"] += sum(len(line) for line in batch)
+        if self.fsync == "flush":
+            self._sync(segment)
+
+    def _should_rotate(self, segment: Dict[str, Any]) -> bool:
+        if segment["file"].tell() >= self.max_bytes:
+            return True
+        return self.max_seconds is not None and time.time() - segment["started"] >= self.max_seconds
+
+    def _open_segment(self) -> Dict[str, Any]:
+        self._sequence += 1
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        name = f"{self.prefix}-{stamp}-{socket.gethostname()}-{os.getpid()}-{self._sequence:04d}{SUFFIXES[self.compression]}"
+        path = self.directory / name
+        raw = open(f"{path}.part", "xb")
+        stream: IO[bytes] = raw
+        if self.compression == "gzip":
+            stream = gzip.GzipFile(filename=name, mode="wb", fileobj=raw)
+        elif self.compression == "zstd":
+            stream = zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=False)
+        self._segment = {"path": path, "file": raw, "stream": stream, "records": 0, "raw_bytes": 0, "started": time.time()}
+        return self._segment
+
+    def _sync(self, segment: Dict[str, Any]) -> None:
+        """Push compressor and file buffers to disk (compressed output stays decodable up to here)."""
+        stream = segment["stream"]
+        if self.compression == "gzip":
+            stream.flush(zlib.Z_SYNC_FLUSH)
+        elif self.compression == "zstd":
+            stream.flush(zstandard.FLUSH_BLOCK)
+        segment["file"].flush()
+        os.fsync(segment["file"].fileno())
+
+    def _finish_segment(self) -> None:
+        segment, self._segment = self._segment, None
+        if segment is None:
+            return
+        if segment["stream"] is not segment["file"]:
+            # Writes the gzip trailer / final zstd frame
+            segment["stream"].close()
+        segment["file"].flush()
+        if self.fsync != "never":
+            os.fsync(segment["file"].fileno())
+        size = segment["file"].tell()
+        segment["file"].close()
+        os.replace(f"{segment['path']}.part", segment["path"])
+        entry = {
+            "segment": segment["path"].name,
+            "records": segment["records"],
+            "bytes": size,
+            "raw_bytes": segment["raw_bytes"],
+            "compression": self.compression,
+            "started": datetime.fromtimestamp(segment["started"], timezone.utc).isoformat(timespec="seconds"),
+            "finished": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+        }
+        self._append_manifest(entry)
+        if self.on_segment:
+            self.on_segment(entry)
+
+    def _append_manifest(self, entry: Dict[str, Any]) -> None:
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        fd = os.open(self.directory / MANIFEST_NAME, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            os.write(fd, line)
+            if self.fsync != "never":
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def read_manifest(directory: Path = DEFAULT_RESULTS_DIR) -> List[Dict[str, Any]]:
+    """Finished segments recorded in directory's manifest, oldest first."""
+    path = Path(directory) / MANIFEST_NAME
+    if not path.exists():
+        return []
+    with path.open(encoding="utf-8") as stream:
+        return [json.loads(line) for line in stream if line.strip()]
+
+
+def add_sink_arguments(parser: argparse.ArgumentParser) -> None:
+    """--results-dir/--compress/--rotate-mb/--rotate-minutes/--fsync options for scripts writing products."""
+    parser.add_argument("--results-dir", default=str(DEFAULT_RESULTS_DIR), help="Directory for JSONL result segments")
+    parser.add_argument("--compress", choices=COMPRESSIONS, default="gzip", help="Result segment compression")
+    parser.add_argument("--rotate-mb", type=float, default=64, help="Start a new result segment at this file size")
+    parser.add_argument("--rotate-minutes", type=float, default=60, help="Start a new result segment after this long")
+    parser.add_argument("--fsync", choices=FSYNC_POLICIES, default="segment", help="When result data is fsynced to disk")
+
+
+def sink_from_args(args: argparse.Namespace, **options: Any) -> JsonlSink:
+    """JsonlSink configured by add_sink_arguments' options; keyword options override them."""
+    settings: Dict[str, Any] = dict(
+        compression=args.compress,
+        max_bytes=int(args.rotate_mb * 1024 ** 2),
+        max_seconds=args.rotate_minutes * 60,
+        fsync=args.fsync,
+    )
+    settings.update(options)
+    return JsonlSink(Path(args.results_dir), **settings)
@@ -0,0 +1,145 @@
+"""Search brain.com.ua and read the result cards, shared by the listing and product scripts."""
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+from selenium import webdriver
+from selenium.common.exceptions import (
+    TimeoutException,
+    NoSuchElementException,
+    ElementClickInterceptedException,
+    ElementNotInteractableException,
+)
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from browser import build_driver
+from driver_pool import DriverPool, borrow_driver
+from rate_limit import RateLimiter, load_page
+from waits import wait_until
+
+# Overridable so benchmarks can point the scraper at a local fake site
+HOME_URL = os.environ.get("BRAIN_HOME_URL", "https://brain.com.ua/")
+SEARCH_INPUT_SELECTOR = (By.CSS_SELECTOR, "input.quick-search-input")
+# Alternative selector for search input (relative CSS selector instead of absolute XPath)
+SEARCH_INPUT_ALT_SELECTOR = (By.CSS_SELECTOR, "header form input.quick-search-input, header input[type='text']")
+SEARCH_BUTTON_SELECTOR = (By.CSS_SELECTOR, "input.qsr-submit")
+FIRST_RESULT_SELECTOR = (By.CSS_SELECTOR, ".br-pp.br-pp-ex.goods-block__item[data-pid]")
+CARD_PRICE_CSS = "[itemprop='price'], [data-price], .br-pp-price-main span, .br-pp-price span, .price"
+
+# First arguments[0] result cards as [pid, href, title, price text] in one round trip
+TOP_RESULTS_JS = """
+var limit = arguments[0], priceCss = arguments[1], out = [];
+var cards = document.querySelectorAll('.goods-block__item[data-pid]');
+for (var i = 0; i < cards.length && out.length < limit; i++) {
+    var card = cards[i];
+    var link = card.querySelector("a[href*='/ukr/']") || card.querySelector('a[href]');
+    if (!link) { continue; }
+    var titleEl = card.querySelector("[itemprop='name'], .br-pp-desc a, a[title]") || link;
+    var title = (titleEl.getAttribute('title') || titleEl.textContent || '').replace(/\\s+/g, ' ').trim();
+    var priceEl = card.querySelector(priceCss);
+    var price = priceEl ? (priceEl.getAttribute('content') || priceEl.getAttribute('data-price') || priceEl.textContent) : null;
+    out.push([card.getAttribute('data-pid'), link.href, title, price]);
+}
+return out;
+"""
+
+
+@dataclass
+class SearchCandidate:
+    pid: str
+    url: str
+    title: str
+    price: Optional[float]
+
+
+def parse_price(text: Optional[str]) -> Optional[float]:
+    """Parse a listing price like "12 999 ₴" or "12999.00" (None if there is no number)."""
+    if not text:
+        return None
+    match = re.search(r"\d[\d\s\u00a0\u202f]*(?:[.,]\d+)?", text)
+    if not match:
+        return None
+    number = re.sub(r"[\s\u00a0\u202f]", "", match.group(0)).replace(",", ".")
+    try:
+        return float(number)
+    except ValueError:
+        return None
+
+
+def submit_search(
+    driver: webdriver.Chrome, query: str, wait: WebDriverWait, limiter: Optional[RateLimiter] = None
+) -> None:
+    """Type query into the header search on the homepage and wait for the results page."""
+    load_page(driver, HOME_URL, limiter)
+
+    # Wait for search input to be clickable (scripts bound, overlays gone)
+    try:
+        search_input = wait_until("search:input", wait, EC.element_to_be_clickable(SEARCH_INPUT_SELECTOR))
+    except (TimeoutException, NoSuchElementException):
+        try:
+            search_input = wait_until("search:input", wait, EC.presence_of_element_located(SEARCH_INPUT_ALT_SELECTOR))
+        except (TimeoutException, NoSuchElementException):
+            # Last resort: try to find any input in header
+            search_input = wait_until("search:input", wait, EC.presence_of_element_located((By.CSS_SELECTOR, "header input[type='text']")))
+
+    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", search_input)
+
+    # Click to focus
+    try:
+        search_input.click()
+    except (ElementNotInteractableException, ElementClickInterceptedException):
+        driver.execute_script("arguments[0].click();", search_input)
+
+    # Clear and send keys using JavaScript as fallback
+    try:
+        search_input.clear()
+    except (ElementNotInteractableException, ElementClickInterceptedException):
+        pass
+
+    # Use JavaScript to set value if send_keys fails
+    try:
+        search_input.send_keys(query)
+    except (ElementNotInteractableException, ElementClickInterceptedException):
+        driver.execute_script("arguments[0].value = arguments[1];", search_input, query)
+        # Trigger input event
+        driver.execute_script("arguments[0].dispatchEvent(new Event('input', { bubbles: true }));", search_input)
+
+    search_button = wait_until("search:button", wait, EC.element_to_be_clickable(SEARCH_BUTTON_SELECTOR))
+    # The homepage may have redirected (locale, tracking parameters): compare against where we are now
+    start_url = driver.current_url
+    if limiter is not None:
+        # Submitting loads the results page: one more request to the host
+        limiter.acquire(HOME_URL)
+    try:
+        search_button.click()
+    except (ElementNotInteractableException, ElementClickInterceptedException):
+        driver.execute_script("arguments[0].click();", search_button)
+
+    # Homepage also has product cards: wait for navigation to the results page first
+    wait_until("search:navigate", wait, lambda d: d.current_url != start_url and "search" in d.current_url.lower())
+
+
+def search_results(
+    query: str,
+    limit: int = 10,
+    timeout: int = 20,
+    pool: Optional[DriverPool] = None,
+    limiter: Optional[RateLimiter] = None,
+) -> List[SearchCandidate]:
+    """Top limit result cards for query, read from the results page in one script call.
+
+    The product pages themselves are not opened; card links are already the
+    canonical product URLs. Returns an empty list when nothing was found.
+    """
+    with borrow_driver(pool, build_driver) as driver:
+        wait = WebDriverWait(driver, timeout)
+        submit_search(driver, query, wait, limiter)
+        try:
+            wait_until("search:results", wait, EC.presence_of_element_located(FIRST_RESULT_SELECTOR))
+        except TimeoutException:
+            return []
+        rows = driver.execute_script(TOP_RESULTS_JS, limit, CARD_PRICE_CSS)
+    return [SearchCandidate(pid=pid, url=url, title=title, price=parse_price(price)) for pid, url, title, price in rows]
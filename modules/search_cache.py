@@ -0,0 +1,107 @@
+"""Persistent query -> product URL cache for search resolution (SQLite)."""
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Dict, Optional
+
+DEFAULT_CACHE_PATH = Path(
+    os.environ.get("SEARCH_CACHE_PATH", Path(__file__).resolve().parent.parent / "results" / "search_cache.sqlite3")
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_cache (
+    query TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS search_cache_last_access ON search_cache (last_access);
+CREATE TABLE IF NOT EXISTS search_cache_stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO search_cache_stats (name, value) VALUES ('hits', 0), ('misses', 0), ('evictions', 0);
+"""
+
+
+def normalize_query(query: str) -> str:
+    """Case-, width- and whitespace-insensitive cache key."""
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+class SearchCache:
+    """Maps normalised search queries to resolved product URLs.
+
+    Entries expire after ttl seconds; when the cache grows beyond max_entries
+    the least recently used entries are evicted. Hit/miss/eviction counters
+    are stored in the database, so they add up across runs and processes.
+    """
+
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH, ttl: float = 7 * 24 * 3600, max_entries: int = 50000) -> None:
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def __enter__(self) -> "SearchCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def get(self, query: str) -> Optional[str]:
+        key = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT url, created_at FROM search_cache WHERE query = ?", (key,)).fetchone()
+            if row and now - row[1] <= self.ttl:
+                self._db.execute("UPDATE search_cache SET last_access = ? WHERE query = ?", (now, key))
+                self._count("hits")
+                return row[0]
+            if row:
+                self._db.execute("DELETE FROM search_cache WHERE query = ?", (key,))
+            self._count("misses")
+            return None
+
+    def set(self, query: str, url: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO search_cache (query, url, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (normalize_query(query), url, now, now),
+            )
+            self._evict()
+
+    def invalidate(self, query: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM search_cache WHERE query = ?", (normalize_query(query),))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._db.execute("SELECT name, value FROM search_cache_stats").fetchall())
+            stats["entries"] = self._db.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        self._db.execute("UPDATE search_cache_stats SET value = value + ? WHERE name = ?", (amount, name))
+
+    def _evict(self) -> None:
+        excess = self._db.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0] - self.max_entries
+        if excess <= 0:
+            return
+        self._db.execute(
+            "DELETE FROM search_cache WHERE query IN (SELECT query FROM search_cache ORDER BY last_access LIMIT ?)",
+            (excess,),
+        )
+        self._count("evictions", excess)
@@ -0,0 +1,218 @@
+"""Content-addressed, compressed store of fetched product pages.
+
+Pages are stored once per distinct content (sha256 of the HTML) under
+objects/<2 hex>/<hash>.zst (or .gz when zstandard is not installed); a SQLite
+index records which URL was fetched when and which objects it produced, so
+identical re-fetches cost one index row and no extra disk. Writes and
+retention run in one BEGIN IMMEDIATE transaction, so several processes can
+share a store without one deleting an object another is about to reference.
+"""
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from sqlite_tx import immediate_transaction
+
+try:
+    import zstandard
+except ImportError:  # optional: gzip is used instead
+    zstandard = None
+
+DEFAULT_SNAPSHOT_DIR = Path(__file__).resolve().parent.parent / "results" / "snapshots"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    page_hash TEXT NOT NULL,
+    characteristics_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS snapshots_url ON snapshots (url, fetched_at);
+CREATE INDEX IF NOT EXISTS snapshots_fetched_at ON snapshots (fetched_at);
+CREATE INDEX IF NOT EXISTS snapshots_page_hash ON snapshots (page_hash);
+CREATE INDEX IF NOT EXISTS snapshots_characteristics_hash ON snapshots (characteristics_hash);
+CREATE TABLE IF NOT EXISTS objects (
+    hash TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+-- Running SUM(objects.size), kept in step by put() and retention
+CREATE TABLE IF NOT EXISTS store_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    total_bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO store_stats (id, total_bytes) SELECT 1, COALESCE(SUM(size), 0) FROM objects;
+"""
+
+
+@dataclass
+class Snapshot:
+    url: str
+    fetched_at: float
+    page_hash: str
+    characteristics_hash: Optional[str]
+
+
+class SnapshotStore:
+    """Stores page HTML (and the expanded characteristics DOM) keyed by URL and fetch time.
+
+    Args:
+        root: Store directory.
+        max_bytes: Retention limit for compressed objects; the oldest snapshots
+            are dropped (and objects no longer referenced deleted) beyond it.
+        level: Compression level.
+    """
+
+    def __init__(self, root: Path = DEFAULT_SNAPSHOT_DIR, max_bytes: int = 5 * 1024 ** 3, level: int = 10) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.level = level
+        (self.root / "objects").mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.root / "index.sqlite3"), timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def __enter__(self) -> "SnapshotStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def put(self, url: str, html: str, characteristics_html: Optional[str] = None, fetched_at: Optional[float] = None) -> str:
+        """Store a fetched page; returns the page content hash."""
+        page = self._prepare(html)
+        characteristics = self._prepare(characteristics_html) if characteristics_html else None
+        with self._transaction() as db:
+            for prepared in (page, characteristics):
+                if prepared is not None:
+                    self._put_object(db, *prepared)
+            db.execute(
+                "INSERT INTO snapshots (url, fetched_at, page_hash, characteristics_hash) VALUES (?, ?, ?, ?)",
+                (url, fetched_at or time.time(), page[0], characteristics[0] if characteristics else None),
+            )
+            self._enforce_retention(db)
+        return page[0]
+
+    def get(self, content_hash: str) -> Optional[str]:
+        """Return stored HTML by content hash."""
+        with self._lock:
+            row = self._db.execute("SELECT path FROM objects WHERE hash = ?", (content_hash,)).fetchone()
+        if not row:
+            return None
+        return read_object(self.root / row[0])
+
+    def latest_pages(self) -> Iterator[Tuple[str, Path]]:
+        """(url, object path) of the newest page snapshot of every URL."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT s.url, o.path FROM snapshots s JOIN objects o ON o.hash = s.page_hash "
+                "WHERE s.fetched_at = (SELECT MAX(fetched_at) FROM snapshots WHERE url = s.url)"
+            ).fetchall()
+        for url, path in rows:
+            yield url, self.root / path
+
+    def history(self, url: str) -> List[Snapshot]:
+        """Snapshots of url, newest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT url, fetched_at, page_hash, characteristics_hash FROM snapshots WHERE url = ? ORDER BY fetched_at DESC",
+                (url,),
+            ).fetchall()
+        return [Snapshot(*row) for row in rows]
+
+    def latest(self, url: str) -> Optional[Snapshot]:
+        history = self.history(url)
+        return history[0] if history else None
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT total_bytes FROM store_stats").fetchone()[0]
+
+    def enforce_retention(self) -> None:
+        """Drop the oldest snapshots until stored objects fit in max_bytes."""
+        with self._transaction() as db:
+            self._enforce_retention(db)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _prepare(self, text: str) -> Tuple[str, bytes, Optional[bytes]]:
+        """(hash, data, compressed data) of text; compressed is None if the object looks stored already.
+
+        Compression happens here, outside the write transaction.
+        """
+        data = text.encode("utf-8")
+        content_hash = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if self._db.execute("SELECT 1 FROM objects WHERE hash = ?", (content_hash,)).fetchone():
+                return content_hash, data, None
+        return content_hash, data, self._compress(data)
+
+    def _put_object(self, db: sqlite3.Connection, content_hash: str, data: bytes, compressed: Optional[bytes]) -> None:
+        """Write the object file and its row unless already stored; runs inside the write transaction."""
+        if db.execute("SELECT 1 FROM objects WHERE hash = ?", (content_hash,)).fetchone():
+            return
+        if compressed is None:
+            # Stored when prepared, but another process's retention removed it since
+            compressed = self._compress(data)
+        suffix = ".zst" if zstandard is not None else ".gz"
+        relative = f"objects/{content_hash[:2]}/{content_hash}{suffix}"
+        path = self.root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(compressed)
+        os.replace(tmp, path)
+        db.execute("INSERT INTO objects (hash, path, size) VALUES (?, ?, ?)", (content_hash, relative, len(compressed)))
+        db.execute("UPDATE store_stats SET total_bytes = total_bytes + ?", (len(compressed),))
+
+    def _enforce_retention(self, db: sqlite3.Connection) -> None:
+        """Drop the oldest snapshots and their unreferenced objects while over max_bytes."""
+        while db.execute("SELECT total_bytes FROM store_stats").fetchone()[0] > self.max_bytes:
+            oldest = db.execute(
+                "SELECT id, page_hash, characteristics_hash FROM snapshots ORDER BY fetched_at LIMIT 100"
+            ).fetchall()
+            if not oldest:
+                break
+            db.executemany("DELETE FROM snapshots WHERE id = ?", [(row_id,) for row_id, _, _ in oldest])
+            candidates = {content_hash for _, *hashes in oldest for content_hash in hashes if content_hash}
+            for content_hash in candidates:
+                if db.execute(
+                    "SELECT 1 FROM snapshots WHERE page_hash = ? OR characteristics_hash = ? LIMIT 1", (content_hash, content_hash)
+                ).fetchone():
+                    continue
+                row = db.execute("SELECT path, size FROM objects WHERE hash = ?", (content_hash,)).fetchone()
+                if row is None:
+                    continue
+                # Deleted while holding the write lock, so no other process can be re-referencing it
+                (self.root / row[0]).unlink(missing_ok=True)
+                db.execute("DELETE FROM objects WHERE hash = ?", (content_hash,))
+                db.execute("UPDATE store_stats SET total_bytes = total_bytes - ?", (row[1],))
+
+    def _transaction(self):
+        return immediate_transaction(self._db, self._lock)
+
+    def _compress(self, data: bytes) -> bytes:
+        if zstandard is not None:
+            return zstandard.ZstdCompressor(level=self.level).compress(data)
+        return gzip.compress(data, compresslevel=min(self.level, 9))
+
+
+def read_object(path: Path) -> str:
+    """Decompress a stored object (or any .zst/.gz/plain HTML file) to text."""
+    data = Path(path).read_bytes()
+    if path.name.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"{path}: install 'zstandard' to read .zst files")
+        data = zstandard.ZstdDecompressor().decompress(data)
+    elif path.name.endswith(".gz"):
+        data = gzip.decompress(data)
+    return data.decode("utf-8", errors="replace")
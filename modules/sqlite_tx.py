@@ -0,0 +1,21 @@
+"""Write transactions for the small SQLite state files shared between processes."""
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+
+@contextmanager
+def immediate_transaction(db: sqlite3.Connection, lock: threading.Lock) -> Iterator[sqlite3.Connection]:
+    """BEGIN IMMEDIATE ... COMMIT: takes SQLite's write lock up front, serialising all processes.
+
+    db must be opened with isolation_level=None; lock serialises the threads sharing it.
+    """
+    with lock:
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
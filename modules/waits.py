@@ -0,0 +1,112 @@
+"""Condition-driven waits for Selenium and a report of time spent waiting."""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from selenium import webdriver
+from selenium.common.exceptions import JavascriptException, StaleElementReferenceException, TimeoutException
+from selenium.webdriver.remote.webelement import WebElement
+from selenium.webdriver.support.ui import WebDriverWait
+
+from metrics import metrics
+
+# Upper bound for DOM-settle waits: pages with carousels or timers never settle
+MAX_SETTLE_SECONDS = 3.0
+
+# Resolves once no DOM mutation happened under root for `quiet` ms (or after `limit` ms).
+# With changeFirst the quiet period only starts at the first mutation: waits for a change, then for it to settle.
+DOM_SETTLED_JS = """
+var root = arguments[0] || document.documentElement, quiet = arguments[1], limit = arguments[2], changeFirst = arguments[3];
+var done = arguments[arguments.length - 1];
+var start = performance.now(), timer = null, hard = null;
+function finish() { observer.disconnect(); clearTimeout(timer); clearTimeout(hard); done(performance.now() - start); }
+var observer = new MutationObserver(function () { clearTimeout(timer); timer = setTimeout(finish, quiet); });
+observer.observe(root, {childList: true, subtree: true, attributes: true, characterData: true});
+if (!changeFirst) { timer = setTimeout(finish, quiet); }
+hard = setTimeout(finish, limit);
+"""
+
+
+class WaitReport:
+    """Collects how long each named step actually waited."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._steps: Dict[str, List[float]] = {}
+
+    def record(self, step: str, seconds: float) -> None:
+        with self._lock:
+            self._steps.setdefault(step, []).append(seconds)
+
+    @contextmanager
+    def measure(self, step: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(step, time.perf_counter() - started)
+
+    def totals(self) -> Dict[str, float]:
+        with self._lock:
+            return {step: sum(values) for step, values in self._steps.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._steps.clear()
+
+    def format(self) -> str:
+        with self._lock:
+            steps = {step: list(values) for step, values in self._steps.items()}
+        lines = [f"  {step:<28} {sum(values):6.2f}s  ({len(values)}x)" for step, values in steps.items()]
+        lines.append(f"  {'total':<28} {sum(sum(values) for values in steps.values()):6.2f}s")
+        return "\n".join(lines)
+
+
+# Process-wide report; main() prints it, batch workers reset it per item
+wait_report = WaitReport()
+
+
+def wait_until(step: str, wait: WebDriverWait, condition: Callable[[webdriver.Chrome], Any]) -> Any:
+    """wait.until(condition), recording the time under step and counting timeouts per step."""
+    with wait_report.measure(step):
+        try:
+            return wait.until(condition)
+        except TimeoutException:
+            metrics.count("scrape_wait_timeouts_total", step=step)
+            raise
+
+
+def wait_dom_settled(
+    driver: webdriver.Chrome,
+    step: str,
+    root: Optional[WebElement] = None,
+    quiet: float = 0.25,
+    timeout: float = 5.0,
+) -> None:
+    """Wait until the DOM under root stops changing for `quiet` seconds.
+
+    Gives up silently after min(timeout, MAX_SETTLE_SECONDS); pass the
+    container being waited on as root, since the whole document rarely settles.
+    """
+    timeout = min(timeout, MAX_SETTLE_SECONDS)
+    with wait_report.measure(step):
+        driver.set_script_timeout(timeout + 1)
+        try:
+            driver.execute_async_script(DOM_SETTLED_JS, root, int(quiet * 1000), int(timeout * 1000), False)
+        except (JavascriptException, StaleElementReferenceException, TimeoutException):
+            pass
+
+
+def wait_dom_changed(driver: webdriver.Chrome, step: str, root: WebElement, quiet: float = 0.25, timeout: float = 10.0) -> None:
+    """Wait for the DOM under root to change (rows added, classes toggled), then to settle.
+
+    For content an action is known to load, e.g. rows fetched by XHR after a
+    click; returns after timeout if nothing changed.
+    """
+    with wait_report.measure(step):
+        driver.set_script_timeout(timeout + 1)
+        try:
+            driver.execute_async_script(DOM_SETTLED_JS, root, int(quiet * 1000), int(timeout * 1000), True)
+        except (JavascriptException, StaleElementReferenceException, TimeoutException):
+            pass
@@ -0,0 +1,81 @@
+import gzip
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import migrations, models
+from django.db.models import Max
+
+# Older per-crawl rows removed by this migration are kept here, one gzipped JSONL file per run
+BACKUP_DIR = Path(
+    os.environ.get("MIGRATION_BACKUP_DIR", Path(__file__).resolve().parents[3] / "results" / "migration_backups")
+)
+BACKUP_PREFIX = "0003_product_duplicates-"
+
+
+def remove_duplicates(apps, schema_editor):
+    """Keep only the newest row per (sku, url) before adding the unique constraint.
+
+    Before the constraint every crawl added a row, so the older rows are the
+    price history: they are written to BACKUP_DIR first and deleted only once
+    the dump is complete (reversing the migration restores them).
+    """
+    Product = apps.get_model("parser_app", "Product")
+    newest = Product.objects.order_by().values("sku", "url").annotate(keep_id=Max("id")).values("keep_id")
+    older = Product.objects.exclude(id__in=newest)
+    if not older.exists():
+        return
+    BACKUP_DIR.mkdir(parents=True, exist_ok=True)
+    path = BACKUP_DIR / f"{BACKUP_PREFIX}{datetime.now():%Y%m%dT%H%M%S}.jsonl.gz"
+    dumped = 0
+    with gzip.open(path, "wt", encoding="utf-8") as stream:
+        for values in older.order_by("id").values().iterator(chunk_size=2000):
+            stream.write(json.dumps(values, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n")
+            dumped += 1
+    older.delete()
+    print(f"\n  Moved {dumped} older duplicate product rows to {path}")
+
+
+def restore_duplicates(apps, schema_editor):
+    """Re-insert the rows dumped by the most recent remove_duplicates run."""
+    Product = apps.get_model("parser_app", "Product")
+    dumps = sorted(BACKUP_DIR.glob(f"{BACKUP_PREFIX}*.jsonl.gz")) if BACKUP_DIR.exists() else []
+    if not dumps:
+        return
+    fields = Product._meta.concrete_fields
+    batch = []
+    with gzip.open(dumps[-1], "rt", encoding="utf-8") as stream:
+        for line in stream:
+            values = json.loads(line)
+            batch.append(Product(**{field.attname: field.to_python(values[field.attname]) for field in fields if field.attname in values}))
+            if len(batch) >= 2000:
+                Product.objects.bulk_create(batch)
+                batch = []
+    Product.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser_app', '0002_alter_product_color_alter_product_description_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='last_seen',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(remove_duplicates, restore_duplicates),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.UniqueConstraint(fields=('sku', 'url'), name='product_sku_url_uniq'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-18 16:22
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction; it doesn't block writes
+    atomic = False
+
+    dependencies = [
+        ('parser_app', '0003_product_content_hash_last_seen_and_more'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='product',
+            index=models.Index(fields=['url'], name='product_url_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=models.Index(fields=['-updated_at'], name='product_updated_at_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['characteristics'], name='product_chars_gin', opclasses=['jsonb_path_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['raw_jsonld'], name='product_jsonld_gin', opclasses=['jsonb_path_ops']),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:42
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_prices(apps, schema_editor):
+    """One observation per priced product, as of its last update."""
+    Product = apps.get_model("parser_app", "Product")
+    PriceObservation = apps.get_model("parser_app", "PriceObservation")
+    products = Product.objects.exclude(price=None, sale_price=None).only("id", "price", "sale_price", "currency", "updated_at")
+    batch = []
+    for product in products.iterator(chunk_size=2000):
+        batch.append(
+            PriceObservation(
+                product_id=product.id,
+                observed_at=product.updated_at,
+                price=product.price,
+                sale_price=product.sale_price,
+                currency=product.currency,
+            )
+        )
+        if len(batch) >= 2000:
+            PriceObservation.objects.bulk_create(batch)
+            batch = []
+    PriceObservation.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser_app', '0006_crawlfrontier_recrawl'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceObservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('observed_at', models.DateTimeField()),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('sale_price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('currency', models.CharField(default='UAH', max_length=8)),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='prices', to='parser_app.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', '-observed_at'], name='price_product_time_idx'), django.contrib.postgres.indexes.BrinIndex(fields=['observed_at'], name='price_observed_brin')],
+            },
+        ),
+        migrations.RunPython(backfill_prices, migrations.RunPython.noop),
+    ]
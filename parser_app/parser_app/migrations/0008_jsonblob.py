@@ -0,0 +1,107 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:44
+
+import hashlib
+import json
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.db import migrations, models
+
+PAYLOAD_FIELDS = (("characteristics", "characteristics_blob_id"), ("raw_jsonld", "raw_jsonld_blob_id"))
+
+
+def canonical_blob(data):
+    """Same hashing as db_writer.canonical_blob, frozen here so the migration never changes with it."""
+    encoded = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest(), len(encoded)
+
+
+def backfill_blobs(apps, schema_editor):
+    """Move every non-empty payload into JsonBlob (once per distinct content) and point the product at it."""
+    Product = apps.get_model("parser_app", "Product")
+    JsonBlob = apps.get_model("parser_app", "JsonBlob")
+    products = Product.objects.only("id", *(field for field, _ in PAYLOAD_FIELDS)).order_by("id")
+    blobs, batch = {}, []
+
+    def flush():
+        JsonBlob.objects.bulk_create(blobs.values(), ignore_conflicts=True)
+        Product.objects.bulk_update(batch, [attname for _, attname in PAYLOAD_FIELDS])
+        blobs.clear()
+        batch.clear()
+
+    for product in products.iterator(chunk_size=2000):
+        for field, attname in PAYLOAD_FIELDS:
+            data = getattr(product, field)
+            if not data:
+                continue
+            digest, size = canonical_blob(data)
+            blobs.setdefault(digest, JsonBlob(hash=digest, data=data, size=size))
+            setattr(product, attname, digest)
+        batch.append(product)
+        if len(batch) >= 2000:
+            flush()
+    flush()
+
+
+def restore_payloads(apps, schema_editor):
+    Product = apps.get_model("parser_app", "Product")
+    products = Product.objects.select_related("characteristics_blob", "raw_jsonld_blob").order_by("id")
+    batch = []
+    for product in products.iterator(chunk_size=2000):
+        for field, attname in PAYLOAD_FIELDS:
+            blob = getattr(product, field + "_blob")
+            setattr(product, field, blob.data if blob is not None else {})
+        batch.append(product)
+        if len(batch) >= 2000:
+            Product.objects.bulk_update(batch, [field for field, _ in PAYLOAD_FIELDS])
+            batch = []
+    Product.objects.bulk_update(batch, [field for field, _ in PAYLOAD_FIELDS])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser_app', '0007_priceobservation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JsonBlob',
+            fields=[
+                ('hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('data', models.JSONField()),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['data'], name='jsonblob_data_gin', opclasses=['jsonb_path_ops'])],
+            },
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='characteristics_blob',
+            field=models.ForeignKey(blank=True, db_column='characteristics_hash', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='parser_app.jsonblob'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='raw_jsonld_blob',
+            field=models.ForeignKey(blank=True, db_column='raw_jsonld_hash', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='parser_app.jsonblob'),
+        ),
+        migrations.RunPython(backfill_blobs, restore_payloads),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_chars_gin',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_jsonld_gin',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='characteristics',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='raw_jsonld',
+        ),
+    ]
@@ -1,10 +1,35 @@
+from django.contrib.postgres.indexes import BrinIndex, GinIndex
 from django.db import models
 
 
+class JsonBlob(models.Model):
+    """JSON payload stored once per distinct content; products reference it by hash."""
+
+    hash = models.CharField(max_length=64, primary_key=True)  # sha256 of the canonical JSON (sorted keys, compact)
+    data = models.JSONField()
+    size = models.PositiveIntegerField(default=0)  # Bytes of the canonical JSON
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # jsonb_path_ops: smaller and faster GIN for @> containment queries
+            GinIndex(fields=["data"], name="jsonblob_data_gin", opclasses=["jsonb_path_ops"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.hash[:12]} ({self.size} bytes)"
+
+
+class ProductQuerySet(models.QuerySet):
+    def with_payloads(self) -> "ProductQuerySet":
+        """Fetch the characteristics and JSON-LD blobs in the same query (see Product.characteristics)."""
+        return self.select_related("characteristics_blob", "raw_jsonld_blob")
+
+
 class Product(models.Model):
     name = models.CharField(max_length=512)
-    url = models.URLField()  # Removed unique constraint to allow duplicates across categories
-    sku = models.CharField(max_length=64)  # Removed unique constraint to allow duplicates across categories
+    url = models.URLField()  # Unique only together with sku (see Meta) to allow duplicates across categories
+    sku = models.CharField(max_length=64)  # Unique only together with url (see Meta) to allow duplicates across categories
     mpn = models.CharField(max_length=64, blank=True, null=True)
     manufacturer = models.CharField(max_length=128, blank=True, null=True)
     color = models.CharField(max_length=128, blank=True, null=True)
@@ -18,14 +43,100 @@ class Product(models.Model):
     review_count = models.PositiveIntegerField(default=0)
     screen_size = models.CharField(max_length=64, blank=True, null=True)
     resolution = models.CharField(max_length=64, blank=True, null=True)
-    characteristics = models.JSONField(default=dict, blank=True)
+    # Identical across recrawls and categories, so stored once in JsonBlob (see the properties below)
+    characteristics_blob = models.ForeignKey(
+        JsonBlob, on_delete=models.PROTECT, null=True, blank=True, related_name="+", db_column="characteristics_hash"
+    )
     missing_fields = models.JSONField(default=list, blank=True)
-    raw_jsonld = models.JSONField(default=dict, blank=True)
+    raw_jsonld_blob = models.ForeignKey(
+        JsonBlob, on_delete=models.PROTECT, null=True, blank=True, related_name="+", db_column="raw_jsonld_hash"
+    )
+    content_hash = models.CharField(max_length=64, blank=True, default="")  # sha256 of the normalised record
+    last_seen = models.DateTimeField(blank=True, null=True)  # Last crawl that saw this product, changed or not
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         ordering = ["-updated_at"]
+        constraints = [
+            models.UniqueConstraint(fields=["sku", "url"], name="product_sku_url_uniq"),
+        ]
+        # Lookups by sku use the (sku, url) unique index above, so sku has no index of its own
+        indexes = [
+            models.Index(fields=["url"], name="product_url_idx"),
+            models.Index(fields=["-updated_at"], name="product_updated_at_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.name} ({self.sku})"
+
+    # Each property loads its blob on first access: use Product.objects.with_payloads() when looping
+    @property
+    def characteristics(self) -> dict:
+        return self.characteristics_blob.data if self.characteristics_blob_id else {}
+
+    @property
+    def raw_jsonld(self) -> dict:
+        return self.raw_jsonld_blob.data if self.raw_jsonld_blob_id else {}
+
+
+class PriceObservation(models.Model):
+    """Price of a product from observed_at until its next observation (appended only on change)."""
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="prices", db_index=False)  # See price_product_time_idx
+    observed_at = models.DateTimeField()
+    price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    sale_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    currency = models.CharField(max_length=8, default="UAH")
+
+    class Meta:
+        indexes = [
+            # "Price at T" and per-product series: newest observation first
+            models.Index(fields=["product", "-observed_at"], name="price_product_time_idx"),
+            # Rows arrive in time order, so a tiny BRIN index serves time-range scans
+            BrinIndex(fields=["observed_at"], name="price_observed_brin"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.product_id} {self.price} {self.currency} @ {self.observed_at:%Y-%m-%d %H:%M}"
+
+
+class CrawlFrontier(models.Model):
+    """One URL (or search query) to crawl; workers lease batches of pending or due rows with SKIP LOCKED."""
+
+    class State(models.TextChoices):
+        PENDING = "pending"
+        IN_PROGRESS = "in_progress"
+        DONE = "done"
+        FAILED = "failed"
+
+    url = models.CharField(max_length=2048, unique=True)  # Product URL or search query, as in batch input files
+    state = models.CharField(max_length=16, choices=State.choices, default=State.PENDING)
+    attempts = models.PositiveIntegerField(default=0)  # Leases taken so far, including the current one
+    last_error = models.TextField(blank=True, default="")
+    leased_by = models.CharField(max_length=128, blank=True, default="")  # "host:pid" of the claiming process
+    lease_expires = models.DateTimeField(blank=True, null=True)  # Expired leases are reclaimed by other workers
+    # Recrawl schedule: done rows are claimed again once next_due has passed
+    next_due = models.DateTimeField(blank=True, null=True)
+    recrawl_seconds = models.PositiveIntegerField(default=0)  # Current revisit interval; halves on change, doubles otherwise
+    checks = models.PositiveIntegerField(default=0)  # Successful fetches
+    changes = models.PositiveIntegerField(default=0)  # Fetches whose product content differed from the previous one
+    last_changed = models.DateTimeField(blank=True, null=True)
+    content_hash = models.CharField(max_length=64, blank=True, default="")  # Same hash as Product.content_hash
+    etag = models.CharField(max_length=256, blank=True, default="")  # Validators for conditional requests
+    last_modified = models.CharField(max_length=64, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Claim scan: pending rows and expired leases in insertion order
+            models.Index(fields=["state", "id"], name="frontier_state_idx"),
+            # Claim scan for recrawls: done rows ordered by due time
+            models.Index(fields=["state", "next_due"], name="frontier_due_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.url} ({self.state})"